@@ -0,0 +1,26 @@
+import random
+import argparse
+
+from utils.func_bench import bench, encode_amount
+from utils.func_convert import avro_decimal_from_base64, avro_decimal_to_float, avro_decimals_to_float
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Microbenchmark: per-value Decimal decode vs batched column decode of Avro decimals.')
+    parser.add_argument('--rows', type=int, default=1000, help='Values per column (one Kafka batch).')
+    parser.add_argument('--repeat', type=int, default=20, help='Repetitions, best time is reported.')
+    parser.add_argument('--scale', type=int, default=2)
+    args = parser.parse_args()
+
+    random.seed(42)
+    column = [encode_amount(random.randint(-10 ** 9, 10 ** 9)) for _ in range(args.rows)]
+
+    results = [
+        bench('decimal (current)', lambda: [float(avro_decimal_from_base64(value, args.scale)) for value in column], args.repeat),
+        bench('int division per value', lambda: [avro_decimal_to_float(value, args.scale) for value in column], args.repeat),
+        bench('batched column', lambda: avro_decimals_to_float(column, args.scale), args.repeat),
+    ]
+
+    baseline_label, baseline_time, baseline_result = results[0]
+    for label, elapsed, result in results:
+        identical = result == baseline_result
+        print(f"{label:<24} {elapsed * 1000:8.3f} ms  {args.rows / elapsed:12,.0f} values/sec  x{baseline_time / elapsed:5.2f}  identical={identical}")
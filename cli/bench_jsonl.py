@@ -0,0 +1,55 @@
+import json
+import random
+import argparse
+
+from utils import func_json
+from utils.func_bench import bench
+
+def make_documents(rows):
+    # transaction-shaped documents after decoding and projection
+    return [{
+        'id': str(tranid),
+        'TRANID': tranid,
+        'ORDER_ID': f'ORD{tranid:010d}',
+        'BILL_AMT': round(random.uniform(1, 10000), 2),
+        'CUR_ACTUAL': 'MYR',
+        'ACTUAL_AMT': round(random.uniform(1, 10000), 2),
+        'STATUS': random.choice(['00', '11', '22']),
+        'TRANKEY': f'{random.getrandbits(128):032x}',
+        'CREATE_DATE': 1700000000000 + tranid * 1000,
+        'CHANNEL': random.choice(['fpx', 'card', 'ewallet']),
+        'MERCHANTID': f'merchant_{random.randint(1, 500)}',
+        'BILLING_NAME': 'John Doe',
+        'BILLING_EMAIL': 'john.doe@example.com',
+        'BILLING_MOBILE': '+60123456789',
+        'BILLING_INFO': 'x' * random.randint(50, 400),
+        'HISTORY': 'status changed ' * random.randint(1, 20),
+        'BIN': random.randint(400000, 499999),
+        'IP': '10.0.0.1'
+    } for tranid in range(rows)]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Microbenchmark: typesense client json.dumps JSONL vs ujson into a reused buffer.')
+    parser.add_argument('--rows', type=int, default=1000, help='Documents per import (one shard chunk).')
+    parser.add_argument('--repeat', type=int, default=20, help='Repetitions, best time is reported.')
+    parser.add_argument('--file', type=str, help='JSON array of documents to use instead of synthetic ones.')
+    args = parser.parse_args()
+
+    random.seed(42)
+    if args.file:
+        with open(args.file) as f:
+            documents = json.load(f)
+    else:
+        documents = make_documents(args.rows)
+    response = '\n'.join(['{"success":true}'] * len(documents))
+
+    # serialize the body, then parse the per-document responses
+    results = [
+        bench('json (typesense client)', lambda: ('\n'.join([json.dumps(document) for document in documents]).encode(), [json.loads(line) for line in response.split('\n')]), args.repeat),
+        bench('ujson + reused buffer', lambda: (func_json.dumps_jsonl(documents), func_json.loads_jsonl(response)), args.repeat),
+    ]
+
+    baseline_label, baseline_time, baseline_result = results[0]
+    for label, elapsed, (body, parsed) in results:
+        identical = [json.loads(line) for line in body.decode().split('\n')] == documents and parsed == baseline_result[1]
+        print(f"{label:<24} {elapsed * 1000:8.3f} ms  {len(body) / elapsed / 1024 / 1024:8.1f} MB/sec  {len(documents) / elapsed:12,.0f} docs/sec  x{baseline_time / elapsed:5.2f}  round_trip={identical}")
@@ -0,0 +1,215 @@
+import os
+import time
+import json
+import random
+import logging
+import argparse
+import resource
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.fake_typesense import FakeCluster
+from utils.func_bench import encode_amount
+
+MONTH_MS = 30 * 24 * 3600 * 1000
+
+def make_transaction(rng, tranid, create_date, update_date):
+    return {
+        'TRANID': tranid,
+        'ORDER_ID': f'ORD{tranid:010d}',
+        'BILL_AMT': encode_amount(rng.randint(100, 1000000)),
+        'ACTUAL_AMT': encode_amount(rng.randint(100, 1000000)),
+        'CUR_AMT': encode_amount(rng.randint(100, 1000000)),
+        'TRANSACTION_COST': encode_amount(rng.randint(0, 5000)),
+        'CUR_ACTUAL': 'MYR',
+        'STATUS': rng.choice(['00', '11', '22']),
+        'TRANKEY': f'{rng.getrandbits(128):032x}',
+        'CREATE_DATE': create_date,
+        'UPDATE_DATE': update_date,
+        'CHANNEL': rng.choice(['fpx', 'card', 'ewallet']),
+        'MERCHANTID': f'merchant_{rng.randint(1, 500)}',
+        'BILLING_NAME': 'John Doe',
+        'BILLING_EMAIL': 'john.doe@example.com',
+        'BILLING_INFO': 'x' * rng.randint(50, 400),
+        'BIN': rng.randint(400000, 499999)
+    }
+
+def make_status_count_mins(rng, key, window_start, update_date):
+    return {
+        'MERCHANTID': f'merchant_{key % 500}',
+        'CHANNEL': ['fpx', 'card', 'ewallet'][key % 3],
+        'L_VERSION': str(key % 7),
+        'CURRENCY': 'MYR',
+        'WINDOW_START': window_start,
+        'STATUS': rng.choice(['00', '11', '22']),
+        'COUNT': rng.randint(1, 1000),
+        'BILL_AMT': encode_amount(rng.randint(100, 100000000)),
+        'UPDATE_DATE': update_date
+    }
+
+def make_batch(rng, endpoint, batch_docs, months, duplicate_ratio, next_key):
+    """One Kafka-sized batch spread over `months` months, with a share of repeated ids (newer versions)."""
+    # recent: months outside the auto-create window would only be dead-lettered
+    now_ms = int(time.time() * 1000)
+    documents = []
+    keys = []
+    for index in range(batch_docs):
+        if keys and rng.random() < duplicate_ratio:
+            key, timestamp = rng.choice(keys)
+        else:
+            key, timestamp = next_key(), now_ms - rng.randrange(months) * MONTH_MS - rng.randrange(MONTH_MS // 60000) * 60000
+            keys.append((key, timestamp))
+        update_date = now_ms + index
+        if endpoint == 'transaction':
+            documents.append(make_transaction(rng, key, timestamp, update_date))
+        else:
+            documents.append(make_status_count_mins(rng, key, timestamp, update_date))
+    return json.dumps(documents).encode(), len(documents)
+
+
+class InProcessSender:
+    """Posts through Django's test client: the whole app path without a server in front."""
+
+    def __init__(self, api_key, verbose=False):
+        import django
+        django.setup()
+        if not verbose:
+            # per-request INFO logs would dominate the measurement
+            logging.disable(logging.INFO)
+        self.api_key = api_key
+        self.local = threading.local()
+
+    def post(self, path, body):
+        from django.test import Client
+        client = getattr(self.local, 'client', None)
+        if client is None:
+            client = self.local.client = Client()
+        response = client.post(path, data=body, content_type='application/json', HTTP_X_API_KEY=self.api_key)
+        return response.status_code, response.content
+
+
+class HttpSender:
+    """Posts to a running server (gunicorn / runserver)."""
+
+    def __init__(self, url, api_key):
+        import requests
+        self.requests = requests
+        self.url = url.rstrip('/')
+        self.api_key = api_key
+        self.local = threading.local()
+
+    def post(self, path, body):
+        session = getattr(self.local, 'session', None)
+        if session is None:
+            session = self.local.session = self.requests.Session()
+        response = session.post(f'{self.url}{path}', data=body, headers={'Content-Type': 'application/json', 'X-API-KEY': self.api_key}, timeout=600)
+        return response.status_code, response.content
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+def rss_bytes():
+    # current resident set of this process (linux), 0 elsewhere
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except OSError:
+        return 0
+
+def run_load(sender, paths, bodies, concurrency, requests_total, duration):
+    lock = threading.Lock()
+    results = []
+    issued = [0]
+    deadline = time.perf_counter() + duration if duration else None
+
+    def worker():
+        while True:
+            with lock:
+                if (deadline is None and issued[0] >= requests_total) or (deadline is not None and time.perf_counter() >= deadline):
+                    return
+                index = issued[0]
+                issued[0] += 1
+            path = paths[index % len(paths)]
+            body, documents = bodies[path][index % len(bodies[path])]
+            start_time = time.perf_counter()
+            try:
+                status_code, _ = sender.post(path, body)
+            except Exception:
+                status_code = 0
+            with lock:
+                results.append((path, status_code, documents, len(body), time.perf_counter() - start_time))
+
+    start_time = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for future in [executor.submit(worker) for _ in range(concurrency)]:
+            future.result()
+    return results, time.perf_counter() - start_time
+
+def report(results, elapsed, cluster):
+    print(f"{'endpoint':<40} {'requests':>8} {'ok':>6} {'docs/sec':>12} {'MB/sec':>8} {'p50 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for path in sorted({result[0] for result in results}) + ['total']:
+        rows = [result for result in results if path in ('total', result[0])]
+        ok = [row for row in rows if 200 <= row[1] < 300]
+        latencies = [row[4] for row in rows]
+        print(f"{path:<40} {len(rows):>8} {len(ok):>6} {sum(row[2] for row in ok) / elapsed:>12,.0f} {sum(row[3] for row in ok) / elapsed / 1024 / 1024:>8.2f} {percentile(latencies, 0.5) * 1000:>9.1f} {percentile(latencies, 0.99) * 1000:>9.1f} {max(latencies, default=0) * 1000:>9.1f}")
+
+    statuses = {}
+    for result in results:
+        statuses[result[1]] = statuses.get(result[1], 0) + 1
+    print(f"status codes: {dict(sorted(statuses.items()))}  elapsed: {elapsed:.2f}sec")
+    print(f"rss (this process): {rss_bytes() / 1024 / 1024:.1f} MB now, {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.1f} MB peak")
+    if cluster is not None:
+        print(f"fake typesense: {cluster.imported:,} document(s) imported, {cluster.rejected:,} rejected")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Ingest load test: synthetic Kafka batches against the ingest endpoints, in-process with a fake Typesense or against a running server.')
+    parser.add_argument('--endpoints', type=str, default='transaction,status_count_mins', help='Comma-separated endpoints to drive (round-robin).')
+    parser.add_argument('--suffix', type=str, default='', help="Endpoint suffix, '_async' for the ASGI views.")
+    parser.add_argument('--url', type=str, help='Base URL of a running server (e.g. http://localhost:8000). Default: in-process app with a fake Typesense.')
+    parser.add_argument('--concurrency', type=int, default=8, help='Concurrent requests.')
+    parser.add_argument('--requests', type=int, default=200, help='Total requests (ignored with --duration).')
+    parser.add_argument('--duration', type=float, default=0, help='Run for this many seconds instead of a request count.')
+    parser.add_argument('--batch-docs', type=int, default=1000, help='Documents per request.')
+    parser.add_argument('--batches', type=int, default=8, help='Distinct pre-generated bodies per endpoint.')
+    parser.add_argument('--months', type=int, default=3, help='Months the documents of a batch are spread over (one collection each).')
+    parser.add_argument('--duplicate-ratio', type=float, default=0.05, help='Share of documents repeating an id earlier in the batch.')
+    parser.add_argument('--nodes', type=int, default=1, help='Fake Typesense nodes (in-process mode).')
+    parser.add_argument('--latency', type=float, default=0.0, help='Fake Typesense seconds per import.')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Fake Typesense extra seconds per import (uniform).')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fake Typesense share of documents rejected as transient.')
+    parser.add_argument('--import-failure-rate', type=float, default=0.0, help='Fake Typesense share of imports failing with 503.')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--verbose', action='store_true', help='Keep the app INFO logs (in-process mode).')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    counter = iter(range(1, 1 << 62))
+    endpoints = {f'/typesense/{endpoint.strip()}{args.suffix}': endpoint.strip() for endpoint in args.endpoints.split(',') if endpoint.strip()}
+    paths = list(endpoints)
+    bodies = {
+        path: [make_batch(rng, endpoint, args.batch_docs, args.months, args.duplicate_ratio, lambda: next(counter)) for _ in range(args.batches)]
+        for path, endpoint in endpoints.items()
+    }
+    api_key = os.environ.setdefault('TYPESENSE_API_KEY', 'load-test')
+
+    cluster = None
+    if args.url:
+        sender = HttpSender(args.url, api_key)
+    else:
+        # app settings are read at import time, point them at the fake cluster before django.setup()
+        cluster = FakeCluster(
+            args.nodes, latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+            import_failure_rate=args.import_failure_rate, keep_documents=False
+        ).start()
+        os.environ['TYPESENSE_NODES'] = ','.join(cluster.urls)
+        os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'django_app.settings')
+        os.environ.setdefault('TYPESENSE_DEAD_LETTER_DIR', '/tmp/load_test_dead_letter')
+        # every month the batches span gets its collection (30-day steps reach one calendar month further)
+        os.environ.setdefault('TYPESENSE_AUTO_CREATE_MONTHS_BACK', str(args.months + 1))
+        sender = InProcessSender(api_key, args.verbose)
+
+    results, elapsed = run_load(sender, paths, bodies, args.concurrency, args.requests, args.duration)
+    report(results, elapsed, cluster)
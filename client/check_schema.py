@@ -1,18 +1,14 @@
-import os
 import json 
 import logging
-import typesense
 import argparse 
 
+from utils import func_client, func_schema
+
 # configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 # client
-client = typesense.Client({
-    'api_key': os.getenv('TYPESENSE_API_KEY'),
-    'nodes': [{'host':  os.getenv('TYPESENSE_ENDPOINT'), 'port':  os.getenv('TYPESENSE_PORT'), 'protocol': 'http'}],
-    'connection_timeout_seconds': 2
-})
+client = func_client.build_client(role='read')
 
 # connect
 def typesense_connect():
@@ -33,15 +29,32 @@ def check_collection_schema(collection_name: str):
     except Exception as e:
         logging.error(f"❌ Failed to retrieve schema for '{collection_name}': {e}")
 
+def diff_collection_schema(collection_name: str):
+    """Compares a live collection with its schema registry entry."""
+    try:
+        expected_schema = func_schema.collection_schema(collection_name)
+        diff = func_schema.diff_schema(expected_schema, client.collections[collection_name].retrieve())
+        if func_schema.has_drift(diff):
+            logging.warning(f"⚠️ '{collection_name}' drifted from schema v{func_schema.schema_version(collection_name)}:")
+            logging.warning(json.dumps(diff, indent=2))
+        else:
+            logging.info(f"✅ '{collection_name}' matches schema v{func_schema.schema_version(collection_name)}")
+    except Exception as e:
+        logging.error(f"❌ Failed to diff schema for '{collection_name}': {e}")
+
 if __name__ == "__main__":
     # arg parsing
     parser = argparse.ArgumentParser() 
     parser.add_argument('--collection-name', type=str, required=True, help='The name of the collection whose schema you want to check.')
+    parser.add_argument('--diff', action='store_true', help='Compare the collection with the schema registry instead of printing it.')
     args = parser.parse_args()
 
     # connect
     typesense_connect()
 
     # check schema
-    check_collection_schema(args.collection_name)
+    if args.diff:
+        diff_collection_schema(args.collection_name)
+    else:
+        check_collection_schema(args.collection_name)
 
@@ -1,21 +1,17 @@
-import os
 import json
 import time
 import logging
 import argparse
-import typesense
 import pandas as pd
 import ujson as json
 
+from utils import func_client
+
 # logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 # Typesense client
-client = typesense.Client({
-    'api_key': os.getenv('TYPESENSE_API_KEY'),
-    'nodes': [{'host':  os.getenv('TYPESENSE_ENDPOINT'), 'port':  os.getenv('TYPESENSE_PORT'), 'protocol': 'http'}],
-    'connection_timeout_seconds': 2
-})
+client = func_client.build_client(role='read')
 
 def typesense_connect():
     try:
@@ -1,4 +1,3 @@
-import typesense
 import ujson as json  # Faster JSON parsing
 import time
 import argparse
@@ -7,15 +6,14 @@ import pandas as pd
 import io
 import logging
 
+from utils import func_client
+
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
 class TypesenseClient:
     def __init__(self, collection_name, logger: logging.Logger | None = None):
         self.collection_name = collection_name
         api_key = os.getenv("TYPESENSE_API_KEY")
-        host = os.getenv("TYPESENSE_ENDPOINT")
-        port = os.getenv("TYPESENSE_PORT")
-        protocol = "http"
         self.logger = logger or logging.getLogger()
         # Runtime metrics
         self._last_duration = None  # seconds of last operation
@@ -25,11 +23,7 @@ class TypesenseClient:
             raise ValueError("TYPESENSE_API_KEY not found in environment variables or .env file.")
 
         try:
-            self.client = typesense.Client({
-                "api_key": api_key,
-                "nodes": [{"host": host, "port": str(port), "protocol": protocol}],
-                "connection_timeout_seconds": 300
-            })
+            self.client = func_client.build_client(api_key=api_key, role='read')
             self.collection = self.client.collections[self.collection_name]
             collection_info = self.collection.retrieve()
             self.default_sorting_field = collection_info.get("default_sorting_field")
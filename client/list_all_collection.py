@@ -1,16 +1,12 @@
-import os
-import typesense
 import logging
 
+from utils import func_client
+
 # configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 # client
-client = typesense.Client({
-    'api_key': os.getenv('TYPESENSE_API_KEY'),
-    'nodes': [{'host':  os.getenv('TYPESENSE_ENDPOINT'), 'port':  os.getenv('TYPESENSE_PORT'), 'protocol': 'http'}],
-    'connection_timeout_seconds': 60
-})
+client = func_client.build_client(role='read')
 # retrieve
 try:
     all_collections = client.collections.retrieve()
@@ -1,19 +1,15 @@
-import os
 import time
 import logging
 import argparse
-import typesense
 import pandas as pd
 
+from utils import func_client
+
 # configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 # client
-client = typesense.Client({
-    'api_key': os.getenv('TYPESENSE_API_KEY'),
-    'nodes': [{'host':  os.getenv('TYPESENSE_ENDPOINT'), 'port':  os.getenv('TYPESENSE_PORT'), 'protocol': 'http'}],
-    'connection_timeout_seconds': 2
-})
+client = func_client.build_client(role='read')
 
 def typesense_connect():
     try:
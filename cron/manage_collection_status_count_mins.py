@@ -3,13 +3,12 @@ import time
 import uuid
 import logging
 import calendar
-import typesense
 from datetime import date, timedelta
 from watchtower import CloudWatchLogHandler
 from typesense.exceptions import ObjectNotFound
 from dateutil.relativedelta import relativedelta
 
-from utils import func_collection
+from utils import func_client, func_collection
 
 # logger
 logging.basicConfig(level=logging.INFO)
@@ -21,11 +20,7 @@ def main():
     process_id = uuid.uuid4()
 
     # typesense client
-    client = typesense.Client({
-        'nodes': [{'host': os.environ.get('TYPESENSE_ENDPOINT'), 'port': os.environ.get('TYPESENSE_PORT'), 'protocol': 'http' }],
-        'api_key': os.environ.get('TYPESENSE_API_KEY'),
-        'connection_timeout_seconds': 600
-    })
+    client = func_client.build_client()
 
     # month keys
     today = date.today()
@@ -42,43 +37,13 @@ def main():
 
     # delete old collection
     old_collection_name = collection_prefix + two_months_ago_str
-    func_collection.delete_old_collection(logger, process_id, client, old_collection_name)
+    func_collection.delete_old_collections(logger, process_id, client, old_collection_name)
 
     # check & create collection
     months_to_check = [last_month_str, current_month_str, next_month_str]
     for month_str in months_to_check:
         collection_name = collection_prefix + month_str
-        schema = {
-            "name": collection_name,
-            "fields": [
-                {"name": "id", "type": "string", "facet": False},
-                {"name": "MERCHANTID", "type": "string", "index": True, "facet": True},
-                {"name": "CHANNEL", "type": "string", "index": True, "facet": True},
-                {"name": "L_VERSION", "type": "string", "index": True, "facet": True},
-                {"name": "UPDATE_DATE", "type": "int64", "sort": True, 'index': True},
-                {"name": "WINDOW_START", "type": "int64", "sort": True, 'index': True},
-                {"name": "WINDOW_END", "type": "int64", "sort": True},
-                {"name": "COUNT_AUTHORIZED", "type": "int32"},
-                {"name": "COUNT_CAPTURED", "type": "int32"},
-                {"name": "COUNT_HOLD", "type": "int32"},
-                {"name": "COUNT_CHARGEBACK", "type": "int32"},
-                {"name": "COUNT_CANCELLED", "type": "int32"},
-                {"name": "COUNT_BLOCKED", "type": "int32"},
-                {"name": "COUNT_FAILED", "type": "int32"},
-                {"name": "COUNT_SETTLED", "type": "int32"},
-                {"name": "COUNT_REQCANCEL", "type": "int32"},
-                {"name": "COUNT_UNKNOWN", "type": "int32"},
-                {"name": "COUNT_PENDING", "type": "int32"},
-                {"name": "COUNT_RELEASE", "type": "int32"},
-                {"name": "COUNT_REJECT", "type": "int32"},
-                {"name": "COUNT_TESTOK", "type": "int32"},
-                {"name": "COUNT_REQCHARGEBACK", "type": "int32"},
-                {"name": "BILL_AMT", "type": "float"},
-                {"name": "CURRENCY", "type": "string", "index": True, "facet": True}
-            ],
-            "default_sorting_field": "WINDOW_START"
-        }
-        func_collection.check_and_create_collection(logger, process_id, client, collection_name, schema)
+        func_collection.sync_collection(logger, process_id, client, collection_name, apply_updates=func_client.env_bool('TYPESENSE_SCHEMA_AUTO_UPDATE'))
     
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -11,6 +11,11 @@ import os
 
 from django.core.asgi import get_asgi_application
 
+from utils import func_client
+
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'django_app.settings')
 
+# one event loop per worker: keep a pooled Typesense client for its lifetime
+func_client.use_persistent_async_client()
+
 application = get_asgi_application()
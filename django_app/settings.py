@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.0/ref/settings/
 """
 
+import os
 from pathlib import Path
 from django.http.request import HttpRequest
 
@@ -139,18 +140,36 @@ LOGGING = {
             'style': '%', 
             'datefmt': '%Y-%m-%d %H:%M:%S',
         },
+        # JSON lines, request PID as correlation id (LOG_FORMAT=json)
+        'json': {
+            '()': 'framework.log.json_formatter.JsonFormatter',
+            'datefmt': '%Y-%m-%dT%H:%M:%S%z',
+        },
+    },
+    'filters': {
+        # rejected API keys are logged, rate-limited, by TypesenseKeyAuth
+        'skip_forbidden': {
+            '()': 'django.utils.log.CallbackFilter',
+            'callback': lambda record: getattr(record, 'status_code', None) != 403,
+        },
     },
     'handlers': {
         'console': {
             'class': 'logging.StreamHandler',
             'level': 'INFO',
-            'formatter': 'simple',
+            'formatter': 'json' if os.environ.get('LOG_FORMAT', 'simple').lower() == 'json' else 'simple',
         },
     },
     'root': {
         'handlers': ['console'],
         'level': 'INFO',
     },
+    'loggers': {
+        'django.request': {
+            'filters': ['skip_forbidden'],
+        },
+    },
 }
 
-DATA_UPLOAD_MAX_MEMORY_SIZE = 52428800 
\ No newline at end of file
+# request body limit for request.body (the ingest stream parser reads request.stream)
+DATA_UPLOAD_MAX_MEMORY_SIZE = int(os.environ.get('DATA_UPLOAD_MAX_MEMORY_SIZE', 52428800))
\ No newline at end of file
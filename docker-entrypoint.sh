@@ -8,5 +8,16 @@ printenv >> /etc/environment # env for cron service
 crontab /app/cron/crontab
 service cron start
 
-python manage.py runserver 0.0.0.0:8000             
+# start server (SERVER_MODE: runserver | gunicorn | gunicorn-asgi), reload gracefully with: kill -HUP 1
+case "$SERVER_MODE" in
+    gunicorn)
+        exec gunicorn django_app.wsgi:application -c /app/gunicorn.conf.py
+        ;;
+    gunicorn-asgi)
+        exec gunicorn django_app.asgi:application -c /app/gunicorn.conf.py --worker-class uvicorn.workers.UvicornWorker
+        ;;
+    *)
+        python manage.py runserver 0.0.0.0:8000
+        ;;
+esac
 # tail -f /dev/null
\ No newline at end of file
@@ -1,22 +1,74 @@
 import os
+import hmac
+import time
 import logging
+import threading
 from rest_framework.authentication import BaseAuthentication
 from rest_framework.exceptions import AuthenticationFailed
 
+from utils.func_client import env_bool
+
 logger = logging.getLogger(__name__)
 
+def load_api_keys():
+    """Named keys from TYPESENSE_AUTH_KEYS ("connector_a:key,connector_b:key"), plus TYPESENSE_API_KEY as 'default'."""
+    api_keys = {}
+    for item in filter(None, (part.strip() for part in os.environ.get('TYPESENSE_AUTH_KEYS', '').split(','))):
+        name, _, key = item.partition(':')
+        if not name or not key:
+            logger.error("Ignoring TYPESENSE_AUTH_KEYS entry without a 'name:key' form")
+            continue
+        api_keys[name.strip()] = key.strip().encode()
+
+    allow_api_key = env_bool('TYPESENSE_AUTH_ALLOW_API_KEY', True)
+    if allow_api_key and os.getenv('TYPESENSE_API_KEY'):
+        api_keys.setdefault('default', os.getenv('TYPESENSE_API_KEY').encode())
+    if not api_keys:
+        logger.error('No API keys configured (TYPESENSE_AUTH_KEYS / TYPESENSE_API_KEY), every request will be rejected')
+    return list(api_keys.items())
+
+# loaded once per process
+API_KEYS = load_api_keys()
+
+
+class RejectionLog:
+    """At most one warning per `interval_seconds`, with the number of rejections it stands for."""
+
+    def __init__(self, interval_seconds):
+        self.interval_seconds = interval_seconds
+        self.last_time = None
+        self.suppressed = 0
+        self.lock = threading.Lock()
+
+    def log(self, reason, request):
+        with self.lock:
+            now = time.monotonic()
+            if self.last_time is not None and now - self.last_time < self.interval_seconds:
+                self.suppressed += 1
+                return
+            suppressed, self.suppressed, self.last_time = self.suppressed, 0, now
+        logger.warning(f"{reason} ({request.META.get('REMOTE_ADDR')} {request.path})" + (f", {suppressed} more rejection(s) not logged" if suppressed else ''))
+
+rejection_log = RejectionLog(float(os.environ.get('TYPESENSE_AUTH_FAIL_LOG_SECONDS', 10)))
+
+
 class TypesenseKeyAuth(BaseAuthentication):
+    """X-API-KEY header checked against the configured keys; request.auth is the matching key name."""
+
     def authenticate(self, request):
         api_key = request.META.get('HTTP_X_API_KEY')
         if not api_key:
-            logger.error('API Key not found')
+            rejection_log.log('API Key not found', request)
             raise AuthenticationFailed('Invalid API Key')
 
-        try:
-            if api_key != os.getenv("TYPESENSE_API_KEY"):
-                logger.error('API Key incorrect')
-                raise AuthenticationFailed('Invalid API Key')
-        except:
+        # constant time, and every key is compared so timing does not tell which one is close
+        candidate = api_key.encode('utf-8', 'surrogateescape')
+        key_name = None
+        for name, key in API_KEYS:
+            if hmac.compare_digest(candidate, key) and key_name is None:
+                key_name = name
+        if key_name is None:
+            rejection_log.log('API Key incorrect', request)
             raise AuthenticationFailed('Invalid API Key')
 
-        return (None, None)
\ No newline at end of file
+        return (None, key_name)
@@ -0,0 +1,36 @@
+import re
+import ujson
+import logging
+
+# "[PID:<uuid>]" prefix carried by every per-request log message
+PROCESS_ID = re.compile(r'\[PID:([0-9a-fA-F-]+)\]')
+
+# attributes every LogRecord has, anything else came in through `extra`
+RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, the request PID and any `extra` fields."""
+
+    def format(self, record):
+        message = record.getMessage()
+        entry = {
+            'time': self.formatTime(record, self.datefmt),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': message
+        }
+        # correlation id: explicit extra, else the PID prefix of the message
+        process_id = getattr(record, 'process_id', None)
+        if process_id is None:
+            match = PROCESS_ID.search(message)
+            process_id = match.group(1) if match else None
+        if process_id is not None:
+            entry['pid'] = str(process_id)
+
+        for key, value in vars(record).items():
+            if key not in RECORD_ATTRIBUTES and key != 'process_id':
+                entry[key] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return ujson.dumps(entry, default=str)
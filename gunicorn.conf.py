@@ -0,0 +1,66 @@
+import os
+import multiprocessing
+
+from utils.func_client import env_bool
+
+# bind
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+
+# workers (gthread for WSGI, uvicorn.workers.UvicornWorker for ASGI)
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 8))
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 1000))
+
+# preload django app + typesense client once in the master, workers fork from it
+preload_app = env_bool('GUNICORN_PRELOAD', True)
+
+# timeouts (imports can take long, keep above TYPESENSE_READ_TIMEOUT)
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 330))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 60))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 75))
+
+# recycle workers to bound memory growth
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 10000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 1000))
+
+# request limits (body size is DATA_UPLOAD_MAX_MEMORY_SIZE, enforced by the ingest stream with a 413)
+limit_request_line = int(os.environ.get('GUNICORN_LIMIT_REQUEST_LINE', 8190))
+limit_request_fields = int(os.environ.get('GUNICORN_LIMIT_REQUEST_FIELDS', 100))
+limit_request_field_size = int(os.environ.get('GUNICORN_LIMIT_REQUEST_FIELD_SIZE', 8190))
+
+# logging
+accesslog = os.environ.get('GUNICORN_ACCESSLOG', '-')
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOGLEVEL', 'info')
+
+# background threads and pooled sockets must not be shared across the fork
+os.environ['SERVER_PRELOAD'] = 'true' if preload_app else 'false'
+
+# /typesense/metrics sums every worker through this directory (set before the app is loaded)
+os.environ.setdefault('TYPESENSE_METRICS_DIR', '/app/temp/metrics')
+
+def on_starting(server):
+    from typesense_app import metrics
+    if metrics.registry.store is not None:
+        metrics.registry.store.clear()
+
+def post_fork(server, worker):
+    from utils import func_client
+    func_client.reset_transport()
+
+    from typesense_app import pipeline
+    pipeline.start_spool()
+
+    from typesense_app import metrics
+    metrics.registry.start_flush()
+
+def worker_exit(server, worker):
+    # last values of a recycled worker
+    from typesense_app import metrics
+    metrics.registry.flush()
+
+def child_exit(server, worker):
+    from typesense_app import metrics
+    if metrics.registry.store is not None:
+        metrics.registry.store.archive(worker.pid, metrics.registry.metrics)
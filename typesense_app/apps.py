@@ -1,5 +1,15 @@
+import os
 from django.apps import AppConfig
 
 class TypesenseConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'typesense_app'
+
+    def ready(self):
+        # preloaded gunicorn master: workers start it after fork (gunicorn.conf.py post_fork)
+        if os.environ.get('SERVER_PRELOAD') == 'true':
+            return
+
+        # async ingest: replay spooled batches left by the previous run
+        from typesense_app import pipeline
+        pipeline.start_spool()
@@ -0,0 +1,85 @@
+import threading
+
+from utils import func_json
+from utils.func_client import env_float, env_int
+
+
+class AdaptiveChunkSizer:
+    """Per-collection import_ chunk size, tracking measured docs/sec so one import takes about `target_seconds`.
+
+    Successful imports move the size towards throughput * target (smoothed), a failed import halves it
+    since oversized requests are the usual cause of timeouts. Sizes stay within [min_docs, max_docs].
+    """
+
+    def __init__(self, min_docs, max_docs, initial_docs, target_seconds):
+        self.min_docs = min_docs
+        self.max_docs = max_docs
+        self.initial_docs = initial_docs
+        self.target_seconds = target_seconds
+        self.sizes = {}
+        self.lock = threading.Lock()
+
+    def chunk_docs(self, collection_name):
+        return int(self.sizes.get(collection_name, self.initial_docs))
+
+    def observe(self, collection_name, documents, latency, failed=False):
+        with self.lock:
+            size = self.sizes.get(collection_name, self.initial_docs)
+            if failed:
+                size = size / 2
+            elif documents and latency > 0:
+                size = 0.7 * size + 0.3 * (documents / latency * self.target_seconds)
+            self.sizes[collection_name] = min(self.max_docs, max(self.min_docs, size))
+
+    def split(self, collection_name, documents):
+        size = self.chunk_docs(collection_name)
+        if len(documents) <= size:
+            return [documents]
+        return [documents[start:start + size] for start in range(0, len(documents), size)]
+
+
+class ChunkBuffer:
+    """Per-collection documents of one request, held until they fill the adaptive chunk size.
+
+    Stream chunks are a fixed number of documents spread over all collections, so each collection is
+    accumulated across them. A newer version of a buffered document replaces it, ids stay unique
+    within a chunk. The remainder is flushed when the request has been read.
+    """
+
+    def __init__(self, sizer):
+        self.sizer = sizer
+        self.pending = {}
+
+    def add(self, sharding_configs):
+        """Yield (collection_name, chunks) for each collection that filled at least one chunk."""
+        for config in sharding_configs.values():
+            for sharding_key, documents_to_upsert in config["data"].items():
+                if not documents_to_upsert:
+                    continue
+                collection_name = config["prefix"] + sharding_key
+                pending = self.pending.setdefault(collection_name, {})
+                for document in documents_to_upsert:
+                    document_id = func_json.document_id(document)
+                    pending.pop(document_id, None)
+                    pending[document_id] = document
+
+                size = self.sizer.chunk_docs(collection_name)
+                if len(pending) >= size:
+                    documents = list(pending.values())
+                    full = len(documents) - len(documents) % size
+                    self.pending[collection_name] = {func_json.document_id(document): document for document in documents[full:]}
+                    yield collection_name, [documents[start:start + size] for start in range(0, full, size)]
+
+    def flush(self):
+        for collection_name, pending in self.pending.items():
+            if pending:
+                yield collection_name, self.sizer.split(collection_name, list(pending.values()))
+        self.pending = {}
+
+
+chunk_sizer = AdaptiveChunkSizer(
+    min_docs=env_int('TYPESENSE_IMPORT_CHUNK_MIN_DOCS', 100),
+    max_docs=env_int('TYPESENSE_IMPORT_CHUNK_MAX_DOCS', 5000),
+    initial_docs=env_int('TYPESENSE_IMPORT_CHUNK_INITIAL_DOCS', 1000),
+    target_seconds=env_float('TYPESENSE_IMPORT_CHUNK_TARGET_SECONDS', 2)
+)
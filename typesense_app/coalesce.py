@@ -0,0 +1,110 @@
+import time
+import logging
+import threading
+from concurrent.futures import Future
+
+# logger
+logger = logging.getLogger(__name__)
+
+
+class ImportCoalescer:
+    """Merges documents for the same collection across concurrent requests into fewer import_ calls.
+
+    A collection's pending documents are flushed once they reach the batch limit (`max_docs`, or
+    the smaller adaptive per-collection chunk size from `chunk_docs`) or the oldest has waited
+    `window_seconds`. Only one import per collection is in flight at a time, so documents keep their
+    arrival order and new ones keep accumulating while the previous import runs.
+    """
+
+    def __init__(self, executor, import_documents, build_result, window_seconds, max_docs, chunk_docs=None):
+        self.executor = executor
+        self.import_documents = import_documents
+        self.build_result = build_result
+        self.window_seconds = window_seconds
+        self.max_docs = max_docs
+        self.chunk_docs = chunk_docs
+        self.condition = threading.Condition()
+        self.pending = {}
+        self.pending_docs = {}
+        self.first_arrival = {}
+        self.in_flight = set()
+        self.thread = None
+
+    def submit(self, process_id, collection_name, documents):
+        future = Future()
+        with self.condition:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.loop, name='typesense_coalescer', daemon=True)
+                self.thread.start()
+            if collection_name not in self.pending:
+                self.pending[collection_name] = []
+                self.pending_docs[collection_name] = 0
+                self.first_arrival[collection_name] = time.monotonic()
+            self.pending[collection_name].append((process_id, documents, future))
+            self.pending_docs[collection_name] += len(documents)
+            self.condition.notify()
+        return future
+
+    def batch_limit(self, collection_name):
+        if self.chunk_docs is None:
+            return self.max_docs
+        return min(self.max_docs, self.chunk_docs(collection_name))
+
+    def take_batch(self, collection_name):
+        # whole request entries, up to the batch limit (at least one entry)
+        entries = self.pending[collection_name]
+        batch_limit = self.batch_limit(collection_name)
+        batch = []
+        batch_docs = 0
+        while entries and (not batch or batch_docs + len(entries[0][1]) <= batch_limit):
+            entry = entries.pop(0)
+            batch.append(entry)
+            batch_docs += len(entry[1])
+
+        if entries:
+            self.pending_docs[collection_name] -= batch_docs
+            self.first_arrival[collection_name] = time.monotonic()
+        else:
+            del self.pending[collection_name], self.pending_docs[collection_name], self.first_arrival[collection_name]
+        return batch
+
+    def loop(self):
+        with self.condition:
+            while True:
+                now = time.monotonic()
+                next_deadline = None
+                for collection_name in list(self.pending):
+                    if collection_name in self.in_flight:
+                        continue
+                    deadline = self.first_arrival[collection_name] + self.window_seconds
+                    if self.pending_docs[collection_name] >= self.batch_limit(collection_name) or now >= deadline:
+                        self.in_flight.add(collection_name)
+                        self.executor.submit(self.run_batch, collection_name, self.take_batch(collection_name))
+                    elif next_deadline is None or deadline < next_deadline:
+                        next_deadline = deadline
+                self.condition.wait(None if next_deadline is None else max(next_deadline - now, 0))
+
+    def run_batch(self, collection_name, batch):
+        start_time = time.time()
+        documents = [document for _, entry_documents, _ in batch for document in entry_documents]
+        response = None
+        error = None
+        try:
+            response = self.import_documents(collection_name, documents)
+        except Exception as e:
+            logger.error(f"ERROR upsert COALESCED-collection ({collection_name}): {e}", exc_info=True)
+            error = e
+        finally:
+            with self.condition:
+                self.in_flight.discard(collection_name)
+                self.condition.notify()
+        logger.info(f"Completed upsert COALESCED-collection ({collection_name}) {len(documents)} docs from {len(batch)} request chunk(s) in {time.time() - start_time:.2f}sec")
+
+        # fan the per-document responses back out to each waiting request
+        offset = 0
+        for process_id, entry_documents, future in batch:
+            entry_response = None if error is not None else response[offset:offset + len(entry_documents)]
+            offset += len(entry_documents)
+            # the shared body is attributed to each request by its share of documents
+            bytes_out = getattr(response, 'bytes_out', 0) * len(entry_documents) // max(len(documents), 1)
+            future.set_result(self.build_result(collection_name, entry_documents, entry_response, error, start_time, bytes_out))
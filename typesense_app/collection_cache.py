@@ -0,0 +1,104 @@
+import re
+import time
+import uuid
+import logging
+import threading
+from datetime import datetime
+from zoneinfo import ZoneInfo
+from typesense.exceptions import ObjectAlreadyExists, ObjectNotFound
+
+from utils import func_collection, func_schema
+from utils.func_client import env_bool, env_float, env_int
+from utils.func_shard import SHARD_TIMEZONE
+
+# logger
+logger = logging.getLogger(__name__)
+
+# collection cache settings
+AUTO_CREATE_COLLECTIONS = env_bool('TYPESENSE_AUTO_CREATE_COLLECTIONS', True)
+COLLECTION_CACHE_TTL_SECONDS = env_float('TYPESENSE_COLLECTION_CACHE_TTL_SECONDS', 300)
+
+# months the cron keeps (last, current, next): only these are auto-created, the cron would drop the others
+AUTO_CREATE_MONTHS_BACK = env_int('TYPESENSE_AUTO_CREATE_MONTHS_BACK', 1)
+AUTO_CREATE_MONTHS_AHEAD = env_int('TYPESENSE_AUTO_CREATE_MONTHS_AHEAD', 1)
+
+# YYYYMM of a sharded collection name (month, week and day keys)
+COLLECTION_MONTH = re.compile(r'__(\d{4})(\d{2})')
+
+
+class CollectionOutsideRetention(Exception):
+    pass
+
+def month_index(year, month):
+    return year * 12 + month - 1
+
+def retention_window(today=None):
+    # (first, last) month index the cron keeps
+    today = today or datetime.now(ZoneInfo(SHARD_TIMEZONE)).date()
+    current = month_index(today.year, today.month)
+    return current - AUTO_CREATE_MONTHS_BACK, current + AUTO_CREATE_MONTHS_AHEAD
+
+def in_retention(collection_name, today=None):
+    match = COLLECTION_MONTH.search(collection_name)
+    if match is None:
+        # not sharded by time
+        return True
+    first, last = retention_window(today)
+    return first <= month_index(int(match.group(1)), int(match.group(2))) <= last
+
+
+class CollectionCache:
+    """Collections known to exist (TTL), so the ingest path checks existence without a round trip.
+
+    A miss retrieves the collection and creates it from the shared schema if it is missing, for months
+    inside the cron's retention window only. A missing month outside it (a 1970 timestamp, a late
+    event for a dropped month) raises CollectionOutsideRetention instead, remembered for the TTL.
+    One lock per name means concurrent chunks for a new month wait for a single creation.
+    """
+
+    def __init__(self, client, ttl_seconds=COLLECTION_CACHE_TTL_SECONDS):
+        self.client = client
+        self.ttl_seconds = ttl_seconds
+        self.known = {}
+        self.outside = {}
+        self.locks = {}
+        self.lock = threading.Lock()
+
+    def is_known(self, collection_name):
+        expiry = self.known.get(collection_name)
+        return expiry is not None and expiry > time.monotonic()
+
+    def invalidate(self, collection_name):
+        self.known.pop(collection_name, None)
+
+    def outside_error(self, collection_name):
+        first, last = retention_window()
+        return CollectionOutsideRetention(f"Collection '{collection_name}' does not exist and is outside the auto-create months {first // 12}{first % 12 + 1:02d}-{last // 12}{last % 12 + 1:02d}")
+
+    def ensure(self, collection_name):
+        if self.is_known(collection_name):
+            return
+        with self.lock:
+            collection_lock = self.locks.setdefault(collection_name, threading.Lock())
+        with collection_lock:
+            if self.is_known(collection_name):
+                return
+            if self.outside.get(collection_name, 0) > time.monotonic():
+                raise self.outside_error(collection_name)
+            process_id = uuid.uuid4()
+            if not in_retention(collection_name):
+                # written to while it still exists, never recreated
+                try:
+                    self.client.collections[collection_name].retrieve()
+                except ObjectNotFound:
+                    self.outside[collection_name] = time.monotonic() + self.ttl_seconds
+                    logger.warning(f"[PID:{process_id}] Collection '{collection_name}' is outside the auto-create months, not created")
+                    raise self.outside_error(collection_name) from None
+                self.known[collection_name] = time.monotonic() + self.ttl_seconds
+                return
+            try:
+                func_collection.check_and_create_collection(logger, process_id, self.client, collection_name, func_schema.collection_schema(collection_name))
+            except ObjectAlreadyExists:
+                # created by another worker process in between
+                logger.info(f"[PID:{process_id}] Collection '{collection_name}' created concurrently")
+            self.known[collection_name] = time.monotonic() + self.ttl_seconds
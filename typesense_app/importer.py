@@ -0,0 +1,246 @@
+import os
+import time
+import asyncio
+import logging
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+
+from typesense.exceptions import ObjectNotFound
+
+from utils import func_client, func_json
+from typesense_app import metrics
+from typesense_app.chunking import ChunkBuffer, chunk_sizer
+from typesense_app.collection_cache import AUTO_CREATE_COLLECTIONS, CollectionCache, CollectionOutsideRetention
+from typesense_app.coalesce import ImportCoalescer
+from typesense_app.limiter import import_limiter
+from typesense_app.retry import RETRY_ENABLED, RetryQueue
+
+# logger
+logger = logging.getLogger(__name__)
+
+# typesense client
+client = func_client.build_client()
+
+# shard import pool (bounded, shared by all requests)
+import_executor = ThreadPoolExecutor(max_workers=int(os.environ.get('TYPESENSE_IMPORT_WORKERS', 8)), thread_name_prefix='typesense_import')
+
+def log_process_time(start_time, log_msg):
+    process_time = time.time() - start_time
+    logger.info(f"{log_msg} in {process_time:.2f}sec")
+
+# known collections, missing ones are created on first write
+collection_cache = CollectionCache(client) if AUTO_CREATE_COLLECTIONS else None
+
+def observe_import(collection_name, documents_to_upsert, latency, failed):
+    # every import_ round trip feeds the admission limiter and the chunk sizer
+    import_limiter.observe(latency, failed)
+    chunk_sizer.observe(collection_name, len(documents_to_upsert), latency, failed)
+
+@contextlib.contextmanager
+def observed_import(collection_name, documents_to_upsert):
+    # one import_ round trip (retries included), sync or async
+    start_time = time.time()
+    failed = True
+    try:
+        yield
+        failed = False
+    except ObjectNotFound:
+        # dropped since it was cached (e.g. by the cron), recreate on the next attempt
+        if collection_cache is not None:
+            collection_cache.invalidate(collection_name)
+        raise
+    finally:
+        observe_import(collection_name, documents_to_upsert, time.time() - start_time, failed)
+
+def import_documents(collection_name, documents_to_upsert):
+    if collection_cache is not None:
+        collection_cache.ensure(collection_name)
+    # raw JSONL in, raw JSONL out: skips the client's json.dumps/json.loads per document
+    body = func_json.dumps_jsonl(documents_to_upsert)
+    with observed_import(collection_name, documents_to_upsert):
+        response = client.collections[collection_name].documents.import_(body, {'action': 'upsert'})
+    return func_json.ImportResponse(func_json.loads_jsonl(response), len(body))
+
+def build_result(collection_name, documents_to_upsert, response, error, start_time, bytes_out=None):
+    processed_count = 0
+    errors = []
+    failures = []
+    retrying = dead_lettered = 0
+    if error is not None:
+        # whole import down (timeout, 503, connection): answered with 503, the connector redelivers it.
+        # Not queued locally as well, the retry queue and dead letters only own per-document failures
+        errors.append(f"Failed to upsert collection {collection_name}: {error}")
+        if isinstance(error, CollectionOutsideRetention) and retry_queue is not None:
+            # no collection for these months and none will be made: redelivery cannot help, kept as dead letters
+            retrying, dead_lettered = retry_queue.add(collection_name, [(document, str(error)) for document in documents_to_upsert])
+    else:
+        # responses are in document order
+        for document, doc_response in zip(documents_to_upsert, response):
+            if doc_response['success']:
+                processed_count += 1
+            else:
+                errors.append(f"Failed to upsert document: {doc_response.get('error')}")
+                failures.append((document, doc_response.get('error')))
+        if retry_queue is not None:
+            if processed_count:
+                retry_queue.discard(collection_name, [func_json.document_id(document) for document, doc_response in zip(documents_to_upsert, response) if doc_response['success']])
+            if failures:
+                retrying, dead_lettered = retry_queue.add(collection_name, failures)
+    return {
+        'collection': collection_name,
+        'documents': len(documents_to_upsert),
+        'processed': processed_count,
+        'errors': errors,
+        'retrying': retrying,
+        'dead_lettered': dead_lettered,
+        'failed': error is not None and not isinstance(error, CollectionOutsideRetention),
+        'import_time': time.time() - start_time,
+        'bytes_out': bytes_out if bytes_out is not None else getattr(response, 'bytes_out', 0)
+    }
+
+def shard_result(process_id, collection_name, documents_to_upsert, start_time, response, error):
+    if error is not None:
+        logger.error(f"[PID:{process_id}] ERROR upsert SINGLE-collection ({collection_name}): {error}", exc_info=error)
+    log_process_time(start_time, f"[PID:{process_id}] Completed upsert SINGLE-collection ({collection_name})")
+    return build_result(collection_name, documents_to_upsert, response, error, start_time)
+
+def import_shard(process_id, collection_name, documents_to_upsert, previous_futures=()):
+    # keep chunks of the same collection in arrival order
+    for previous_future in previous_futures:
+        previous_future.result()
+
+    start_time = time.time()
+    try:
+        response, error = import_documents(collection_name, documents_to_upsert), None
+    except Exception as e:
+        response, error = None, e
+    return shard_result(process_id, collection_name, documents_to_upsert, start_time, response, error)
+
+# failed documents are retried (transient) or dead-lettered (permanent) locally
+retry_queue = RetryQueue(import_documents) if RETRY_ENABLED else None
+
+# micro-batch coalescing of imports across concurrent requests (off when window is 0)
+coalescer = None
+if float(os.environ.get('TYPESENSE_COALESCE_MS', 0)) > 0:
+    coalescer = ImportCoalescer(
+        import_executor,
+        import_documents,
+        build_result,
+        window_seconds=float(os.environ.get('TYPESENSE_COALESCE_MS')) / 1000,
+        max_docs=int(os.environ.get('TYPESENSE_COALESCE_MAX_DOCS', 5000)),
+        chunk_docs=chunk_sizer.chunk_docs
+    )
+
+
+class ShardImporter:
+    """Submits shard chunks of one request to the pool and merges their results per collection.
+
+    Each collection's documents are buffered up to the adaptive chunk size. Pieces of one submission
+    carry unique ids and are imported side by side; the next submission for the same collection waits
+    for all of them, so a later version of a document never lands first.
+    """
+
+    def __init__(self, process_id, endpoint):
+        self.process_id = process_id
+        self.endpoint = endpoint
+        self.buffer = ChunkBuffer(chunk_sizer)
+        self.pending = []
+        self.last_pending = {}
+
+    def start_import(self, collection_name, documents, previous_futures):
+        if coalescer is not None:
+            # the coalescer keeps per-collection arrival order itself
+            return coalescer.submit(self.process_id, collection_name, documents)
+        return import_executor.submit(import_shard, self.process_id, collection_name, documents, previous_futures)
+
+    def submit_chunks(self, collection_name, chunks):
+        previous = self.last_pending.get(collection_name, [])
+        pending = [self.start_import(collection_name, documents, previous) for documents in chunks]
+        self.last_pending[collection_name] = pending
+        self.pending.extend(pending)
+
+    def submit(self, sharding_configs):
+        for collection_name, chunks in self.buffer.add(sharding_configs):
+            self.submit_chunks(collection_name, chunks)
+
+    def flush(self):
+        # buffered remainders go out too; returns every import started since the last wait
+        for collection_name, chunks in self.buffer.flush():
+            self.submit_chunks(collection_name, chunks)
+        pending, self.pending = self.pending, []
+        return pending
+
+    def merge(self, chunk_results):
+        return merge_results(observe_chunks(self.endpoint, chunk_results))
+
+    def wait(self):
+        return self.merge([future.result() for future in self.flush()])
+
+
+def observe_chunks(endpoint, chunk_results):
+    for chunk_result in chunk_results:
+        collection_name = chunk_result['collection']
+        metrics.IMPORT_SECONDS.observe(chunk_result['import_time'], endpoint=endpoint, collection=collection_name)
+        metrics.IMPORT_DOCUMENTS.inc(chunk_result['processed'], endpoint=endpoint, collection=collection_name, outcome='processed')
+        metrics.IMPORT_DOCUMENTS.inc(chunk_result['documents'] - chunk_result['processed'], endpoint=endpoint, collection=collection_name, outcome='failed')
+        metrics.IMPORT_DOCUMENTS.inc(chunk_result['retrying'], endpoint=endpoint, collection=collection_name, outcome='retrying')
+        metrics.IMPORT_DOCUMENTS.inc(chunk_result['dead_lettered'], endpoint=endpoint, collection=collection_name, outcome='dead_lettered')
+        metrics.IMPORT_ERRORS.inc(len(chunk_result['errors']), endpoint=endpoint, collection=collection_name)
+    return chunk_results
+
+def merge_results(chunk_results):
+    # one entry per collection, summed over its chunks
+    shard_results = {}
+    for chunk_result in chunk_results:
+        shard_result = shard_results.setdefault(chunk_result['collection'], {
+            'collection': chunk_result['collection'], 'chunks': 0, 'documents': 0, 'processed': 0, 'errors': [], 'retrying': 0, 'dead_lettered': 0, 'failed': False, 'import_time': 0.0, 'bytes_out': 0
+        })
+        shard_result['chunks'] += 1
+        shard_result['documents'] += chunk_result['documents']
+        shard_result['processed'] += chunk_result['processed']
+        shard_result['errors'].extend(chunk_result['errors'])
+        shard_result['retrying'] += chunk_result['retrying']
+        shard_result['dead_lettered'] += chunk_result['dead_lettered']
+        shard_result['failed'] = shard_result['failed'] or chunk_result['failed']
+        shard_result['import_time'] += chunk_result['import_time']
+        shard_result['bytes_out'] += chunk_result['bytes_out']
+
+    for shard_result in shard_results.values():
+        import_time = shard_result.pop('import_time')
+        shard_result['import_seconds'] = round(import_time, 4)
+        shard_result['response_time'] = f"{import_time:.2f} seconds"
+    return list(shard_results.values())
+
+
+async def async_import_documents(collection_name, documents_to_upsert):
+    if collection_cache is not None and not collection_cache.is_known(collection_name):
+        await asyncio.get_running_loop().run_in_executor(None, collection_cache.ensure, collection_name)
+    body = func_json.dumps_jsonl(documents_to_upsert)
+    content, headers = func_client.prepare_body(body)
+    with observed_import(collection_name, documents_to_upsert):
+        response = await func_client.async_post(f'/collections/{collection_name}/documents/import', content, params={'action': 'upsert'}, headers=headers)
+    return func_json.ImportResponse(func_json.loads_jsonl(response.text), len(body))
+
+async def async_import_shard(process_id, collection_name, documents_to_upsert, previous_tasks=()):
+    # keep chunks of the same collection in arrival order
+    for previous_task in previous_tasks:
+        await asyncio.shield(previous_task)
+
+    if coalescer is not None:
+        return await asyncio.wrap_future(coalescer.submit(process_id, collection_name, documents_to_upsert))
+    start_time = time.time()
+    try:
+        response, error = await async_import_documents(collection_name, documents_to_upsert), None
+    except Exception as e:
+        response, error = None, e
+    return shard_result(process_id, collection_name, documents_to_upsert, start_time, response, error)
+
+
+class AsyncShardImporter(ShardImporter):
+    """Event-loop counterpart of ShardImporter: one task per shard chunk, non-blocking HTTP."""
+
+    def start_import(self, collection_name, documents, previous_tasks):
+        return asyncio.ensure_future(async_import_shard(self.process_id, collection_name, documents, previous_tasks))
+
+    async def wait(self):
+        return self.merge(await asyncio.gather(*self.flush()))
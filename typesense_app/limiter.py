@@ -0,0 +1,66 @@
+import math
+import time
+import threading
+
+from utils.func_client import env_bool, env_float, env_int
+
+
+class AdaptiveLimiter:
+    """AIMD concurrency limit for ingest requests, driven by observed import_ latency.
+
+    Every import below `target_latency` grows the limit by 1/limit (about +1 per window of requests),
+    a slow or failed import shrinks it by `decrease_factor`, at most once per `target_latency` so
+    one slow burst does not collapse it to the floor.
+    """
+
+    def __init__(self, min_limit, max_limit, initial_limit, target_latency, decrease_factor=0.7):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.limit = float(initial_limit)
+        self.target_latency = target_latency
+        self.decrease_factor = decrease_factor
+        self.in_flight = 0
+        self.latency_ewma = 0.0
+        self.last_decrease = 0.0
+        self.last_failed = False
+        self.lock = threading.Lock()
+
+    def try_acquire(self):
+        with self.lock:
+            if self.in_flight >= int(self.limit):
+                return False
+            self.in_flight += 1
+            return True
+
+    def release(self):
+        with self.lock:
+            self.in_flight -= 1
+
+    def observe(self, latency, failed=False):
+        with self.lock:
+            self.latency_ewma = latency if not self.latency_ewma else 0.8 * self.latency_ewma + 0.2 * latency
+            self.last_failed = failed
+            if failed or latency > self.target_latency:
+                now = time.monotonic()
+                if now - self.last_decrease >= self.target_latency:
+                    self.limit = max(self.min_limit, self.limit * self.decrease_factor)
+                    self.last_decrease = now
+            else:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+    def retry_after(self):
+        # about one import round trip, the time it takes for a slot to free up
+        return max(1, math.ceil(self.latency_ewma))
+
+    def status(self):
+        return {'limit': int(self.limit), 'in_flight': self.in_flight, 'latency_ewma': round(self.latency_ewma, 3)}
+
+
+LIMIT_ENABLED = env_bool('TYPESENSE_LIMIT_ENABLED', True)
+
+import_limiter = AdaptiveLimiter(
+    min_limit=env_int('TYPESENSE_LIMIT_MIN', 1),
+    max_limit=env_int('TYPESENSE_LIMIT_MAX', 64),
+    initial_limit=env_int('TYPESENSE_LIMIT_INITIAL', 16),
+    target_latency=env_float('TYPESENSE_LIMIT_TARGET_SECONDS', 5)
+)
@@ -0,0 +1,246 @@
+import os
+import glob
+import json
+import fcntl
+import bisect
+import logging
+import threading
+
+# logger
+logger = logging.getLogger(__name__)
+
+# multi-worker servers: each worker writes its values here, a scrape on any worker sums them (unset: this process only)
+METRICS_DIR = os.environ.get('TYPESENSE_METRICS_DIR') or None
+METRICS_FLUSH_SECONDS = float(os.environ.get('TYPESENSE_METRICS_FLUSH_SECONDS') or 5)
+
+# seconds, from a small chunk import up to the import read timeout
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+
+def format_labels(labelnames, labelvalues, extra=None):
+    pairs = list(zip(labelnames, labelvalues)) + ([extra] if extra else [])
+    if not pairs:
+        return ''
+    escaped = [(name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')) for name, value in pairs]
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+def format_value(value):
+    return repr(float(value)) if value != float('inf') else '+Inf'
+
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels[name] for name in self.labelnames)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def snapshot(self):
+        with self.lock:
+            return [[list(key), value] for key, value in self.values.items()]
+
+    @staticmethod
+    def merge(values, snapshot):
+        for key, value in snapshot:
+            key = tuple(key)
+            values[key] = values.get(key, 0) + value
+
+    def render(self, values=None):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        with self.lock:
+            for key, value in sorted((self.values if values is None else values).items()):
+                lines.append(f'{self.name}{format_labels(self.labelnames, key)} {format_value(value)}')
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels[name] for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            series = self.values.get(key)
+            if series is None:
+                # per-bucket counts (+Inf last), sum, count
+                series = self.values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def snapshot(self):
+        with self.lock:
+            return [[list(key), [list(bucket_counts), total, count]] for key, (bucket_counts, total, count) in self.values.items()]
+
+    @staticmethod
+    def merge(values, snapshot):
+        for key, (bucket_counts, total, count) in snapshot:
+            key = tuple(key)
+            series = values.get(key)
+            if series is None:
+                values[key] = [list(bucket_counts), total, count]
+                continue
+            series[0] = [a + b for a, b in zip(series[0], bucket_counts)]
+            series[1] += total
+            series[2] += count
+
+    def render(self, values=None):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self.lock:
+            for key, (bucket_counts, total, count) in sorted((self.values if values is None else values).items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets + (float('inf'),), bucket_counts):
+                    cumulative += bucket_count
+                    lines.append(f'{self.name}_bucket{format_labels(self.labelnames, key, ("le", format_value(bound)))} {cumulative}')
+                lines.append(f'{self.name}_sum{format_labels(self.labelnames, key)} {format_value(total)}')
+                lines.append(f'{self.name}_count{format_labels(self.labelnames, key)} {count}')
+        return lines
+
+
+class MultiprocessStore:
+    """One JSON snapshot per worker pid in `directory`, plus `archive.json` holding the totals of exited workers.
+
+    Counters and histograms only grow, so the sum over all files is the server-wide value and does not
+    go backwards when gunicorn recycles a worker (max_requests).
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.archive_path = os.path.join(directory, 'archive.json')
+
+    def worker_path(self, pid):
+        return os.path.join(self.directory, f'worker_{pid}.json')
+
+    def locked(self):
+        # readers and the archiving master must not see a worker both archived and still on disk
+        os.makedirs(self.directory, exist_ok=True)
+        lock_file = open(os.path.join(self.directory, '.lock'), 'a')
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        return lock_file
+
+    def load(self, path):
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def dump(self, path, snapshot):
+        # atomic replace, a concurrent reader sees the old or the new file
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(snapshot, f)
+        os.replace(tmp_path, path)
+
+    def write(self, pid, snapshot):
+        os.makedirs(self.directory, exist_ok=True)
+        self.dump(self.worker_path(pid), snapshot)
+
+    def read_all(self):
+        with self.locked():
+            return [self.load(path) for path in glob.glob(os.path.join(self.directory, 'worker_*.json')) + [self.archive_path]]
+
+    def archive(self, pid, metrics):
+        """Fold an exited worker's snapshot into the archive (gunicorn master, child_exit)."""
+        with self.locked():
+            path = self.worker_path(pid)
+            if not os.path.exists(path):
+                return
+            snapshots = [self.load(self.archive_path), self.load(path)]
+            self.dump(self.archive_path, {metric.name: merged_snapshot(metric, snapshots) for metric in metrics})
+            os.remove(path)
+
+    def clear(self):
+        # server start: values of a previous run are not carried over
+        for path in glob.glob(os.path.join(self.directory, '*.json')):
+            os.remove(path)
+
+def merge_snapshots(metric, snapshots):
+    values = {}
+    for snapshot in snapshots:
+        metric.merge(values, snapshot.get(metric.name, []))
+    return values
+
+def merged_snapshot(metric, snapshots):
+    return [[list(key), value] for key, value in merge_snapshots(metric, snapshots).items()]
+
+
+class Registry:
+    """Metrics rendered in the Prometheus text exposition format, summed over workers when a multiprocess store is set."""
+
+    def __init__(self, store=None):
+        self.metrics = []
+        self.store = store
+        self.flush_thread = None
+        self.stopped = threading.Event()
+
+    def counter(self, name, documentation, labelnames=()):
+        metric = Counter(name, documentation, labelnames)
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self.metrics.append(metric)
+        return metric
+
+    def snapshot(self):
+        return {metric.name: metric.snapshot() for metric in self.metrics}
+
+    def flush(self):
+        if self.store is None:
+            return
+        try:
+            self.store.write(os.getpid(), self.snapshot())
+        except Exception as e:
+            logger.error(f"ERROR writing metrics to {self.store.directory}: {e}")
+
+    def flush_loop(self):
+        while not self.stopped.wait(METRICS_FLUSH_SECONDS):
+            self.flush()
+
+    def start_flush(self):
+        # per worker, after fork (the thread does not survive it)
+        if self.store is None or (self.flush_thread is not None and self.flush_thread.is_alive()):
+            return
+        self.flush_thread = threading.Thread(target=self.flush_loop, name='typesense_metrics_flush', daemon=True)
+        self.flush_thread.start()
+
+    def render(self):
+        if self.store is None:
+            return '\n'.join(line for metric in self.metrics for line in metric.render()) + '\n'
+
+        # this worker fresh, the others as of their last flush
+        self.flush()
+        snapshots = self.store.read_all()
+        return '\n'.join(line for metric in self.metrics for line in metric.render(merge_snapshots(metric, snapshots))) + '\n'
+
+
+registry = Registry(MultiprocessStore(METRICS_DIR) if METRICS_DIR else None)
+
+# ingest stages
+PARSE_SECONDS = registry.histogram('typesense_ingest_parse_seconds', 'JSON stream parsing and duplicate collapsing per request', ['endpoint'])
+PREPROCESS_SECONDS = registry.histogram('typesense_ingest_preprocess_seconds', 'Decimal decoding and sharding per request', ['endpoint'])
+SHARD_SECONDS = registry.histogram('typesense_ingest_shard_seconds', 'Wait for all shard imports of a request after parsing', ['endpoint'])
+IMPORT_SECONDS = registry.histogram('typesense_import_seconds', 'One import_ chunk per collection', ['endpoint', 'collection'])
+RESPONSE_SECONDS = registry.histogram('typesense_ingest_response_seconds', 'Total ingest response time', ['endpoint', 'status'])
+
+# volume
+REQUEST_BYTES = registry.counter('typesense_ingest_request_bytes_total', 'Ingest request body bytes', ['endpoint'])
+DOCUMENTS = registry.counter('typesense_ingest_documents_total', 'Documents per ingest outcome (parsed, collapsed)', ['endpoint', 'outcome'])
+IMPORT_DOCUMENTS = registry.counter('typesense_import_documents_total', 'Imported documents per outcome (processed, failed, retrying, dead_lettered)', ['endpoint', 'collection', 'outcome'])
+KEY_REQUESTS = registry.counter('typesense_key_requests_total', 'Ingest requests per API key name', ['key', 'endpoint', 'status'])
+KEY_DOCUMENTS = registry.counter('typesense_key_documents_total', 'Documents received per API key name (spooled batches are counted as requests only)', ['key', 'endpoint'])
+IMPORT_ERRORS = registry.counter('typesense_import_errors_total', 'Document and whole-import errors', ['endpoint', 'collection'])
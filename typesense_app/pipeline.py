@@ -0,0 +1,522 @@
+import io
+import os
+import ujson
+import asyncio
+import time
+import uuid
+import logging
+from collections import defaultdict
+from django.conf import settings
+from django.http import JsonResponse
+from asgiref.sync import sync_to_async
+
+from utils import func_client, func_convert, func_json, func_schema, func_shard, func_stream
+from typesense_app import metrics, spool
+from typesense_app.limiter import LIMIT_ENABLED, import_limiter
+from typesense_app.profiling import profiler_state
+from typesense_app.importer import AsyncShardImporter, ShardImporter, log_process_time
+
+# logger
+logger = logging.getLogger(__name__)
+
+# ingest stream chunking
+STREAM_READ_BYTES = int(os.environ.get('TYPESENSE_STREAM_READ_BYTES', 65536))
+STREAM_CHUNK_DOCS = int(os.environ.get('TYPESENSE_STREAM_CHUNK_DOCS', 1000))
+
+# ingest reads the raw stream, so Django's own body limit never applies: enforced here (None disables)
+MAX_BODY_BYTES = settings.DATA_UPLOAD_MAX_MEMORY_SIZE
+
+# keep only schema fields (typed, no nulls) in imported documents
+PROJECT_DOCUMENTS = func_client.env_bool('TYPESENSE_PROJECT_DOCUMENTS', True)
+
+# ingest endpoints: document id, shard timestamp, decoded fields, registry schema and target shards
+INGEST_CONFIGS = {
+    'transaction': {
+        'id_fields': ['TRANID'],
+        'timestamp_field': 'CREATE_DATE',
+        'decimal_fields': ['BILL_AMT', 'ACTUAL_AMT', 'REFUND_AMT', 'DEF_AMT', 'CUR_AMT', 'TRANSACTION_COST', 'CHANNEL_COST'],
+        'decimal_scale': 2,
+        'version_field': 'UPDATE_DATE',
+        'schema': 'transaction',
+        'shards': {
+            'YYYYMM': {'granularity': 'month', 'prefix': 'transaction_month__'}
+        }
+    },
+    'status_count_mins': {
+        'id_fields': ['MERCHANTID', 'CHANNEL', 'L_VERSION', 'CURRENCY', 'WINDOW_START'],
+        'timestamp_field': 'WINDOW_START',
+        'decimal_fields': ['BILL_AMT'],
+        'decimal_scale': 2,
+        'version_field': 'UPDATE_DATE',
+        'schema': 'status_count_mins',
+        'shards': {
+            'YYYYMM': {'granularity': 'month', 'prefix': 'status_count_mins_month__'}
+        }
+    }
+}
+
+def parse_hot_shards(value):
+    # "transaction_month__202511=day,status_count_mins_month__202510=week" -> {prefix: {key: granularity}}
+    hot_shards = defaultdict(dict)
+    for item in filter(None, (part.strip() for part in (value or '').split(','))):
+        collection_name, granularity = item.split('=', 1)
+        prefix, sharding_key = collection_name.rsplit('__', 1)
+        hot_shards[prefix + '__'][sharding_key] = granularity.strip()
+    return hot_shards
+
+# hot month collections split into finer shards
+HOT_SHARDS = parse_hot_shards(os.environ.get('TYPESENSE_HOT_SHARDS'))
+
+# endpoints whose payloads are already Typesense documents: forwarded as raw bytes, no decode/encode
+PASSTHROUGH_ENDPOINTS = set(filter(None, (endpoint.strip() for endpoint in os.environ.get('TYPESENSE_PASSTHROUGH_ENDPOINTS', '').split(','))))
+
+# endpoints acknowledged with 202 after spooling, imported by the spool drainer
+ASYNC_ENDPOINTS = set(filter(None, (endpoint.strip() for endpoint in os.environ.get('TYPESENSE_ASYNC_ENDPOINTS', '').split(','))))
+
+
+class ShardingStrategy:
+    """Maps a document timestamp to a shard key, splitting configured hot periods into finer shards."""
+
+    def __init__(self, name, config, hot_shards=None):
+        self.name = name
+        self.prefix = config['prefix']
+        self.key_table = func_shard.period_key_table(config.get('granularity', 'month'))
+        self.split_tables = {
+            sharding_key: func_shard.period_key_table(granularity)
+            for sharding_key, granularity in (hot_shards or {}).get(self.prefix, {}).items()
+        }
+
+    def shard_key(self, timestamp_ms):
+        sharding_key = self.key_table.key(timestamp_ms)
+        if self.split_tables:
+            split_table = self.split_tables.get(sharding_key)
+            if split_table is not None:
+                return split_table.key(timestamp_ms)
+        return sharding_key
+
+
+class BodyTooLarge(Exception):
+    pass
+
+
+class CountingStream:
+    """Read-through wrapper that adds the bytes read from the request body to the stats, up to `max_bytes`."""
+
+    def __init__(self, stream, stats, max_bytes=None):
+        self.stream = stream
+        self.stats = stats
+        self.max_bytes = max_bytes
+
+    def read(self, *args):
+        if self.max_bytes is not None and (not args or args[0] is None or args[0] < 0):
+            # whole-body read: stop one byte past the limit instead of buffering all of it
+            args = (self.max_bytes - self.stats['bytes_in'] + 1,)
+        data = self.stream.read(*args)
+        self.stats['bytes_in'] += len(data)
+        if self.max_bytes is not None and self.stats['bytes_in'] > self.max_bytes:
+            raise BodyTooLarge(f"Request body exceeds {self.max_bytes} bytes (DATA_UPLOAD_MAX_MEMORY_SIZE)")
+        return data
+
+
+class IngestPipeline:
+    """Stream-parse, preprocess, shard and import one ingest endpoint's batches."""
+
+    def __init__(self, endpoint, config, hot_shards=None):
+        self.endpoint = endpoint
+        self.id_fields = config['id_fields']
+        self.timestamp_field = config['timestamp_field']
+        self.decimal_fields = config.get('decimal_fields', [])
+        self.decimal_scale = config.get('decimal_scale', 2)
+        self.version_field = config.get('version_field')
+        self.projector = None
+        if PROJECT_DOCUMENTS and config.get('schema'):
+            schema = func_schema.collection_schema(config['schema'])
+            self.projector = func_schema.compile_projector(schema)
+            # fields the projector drops are not worth decoding
+            schema_fields = {field['name'] for field in schema['fields']}
+            self.decimal_fields = [field for field in self.decimal_fields if field in schema_fields]
+        self.strategies = [ShardingStrategy(name, shard_config, hot_shards) for name, shard_config in config['shards'].items()]
+        self.passthrough = endpoint in PASSTHROUGH_ENDPOINTS
+        if self.passthrough:
+            self.raw_patterns = {field: func_stream.raw_field_pattern(field) for field in ['id', self.timestamp_field, self.version_field] + self.id_fields if field}
+
+    def document_id(self, payload):
+        values = [payload.get(field) for field in self.id_fields]
+        if None in values:
+            # a "None" id would collapse every such document into one
+            missing = [field for field, value in zip(self.id_fields, values) if value is None]
+            raise ValueError(f"Document without id field(s) {', '.join(missing)}")
+        if len(values) == 1:
+            return str(values[0])
+        return '__'.join([str(value) for value in values])
+
+    def is_newer(self, payload_version, version):
+        # missing versions fall back to arrival order (later wins)
+        return payload_version is None or version is None or payload_version >= version
+
+    def sharding_configs(self, chunk_docs):
+        shard_docs = {strategy.name: defaultdict(list) for strategy in self.strategies}
+        for document in chunk_docs:
+            timestamp_ms = document.get(self.timestamp_field)
+            for strategy in self.strategies:
+                shard_docs[strategy.name][strategy.shard_key(timestamp_ms)].append(document)
+        return {strategy.name: {"data": shard_docs[strategy.name], "prefix": strategy.prefix} for strategy in self.strategies}
+
+    def prepare_chunk(self, chunk_docs, stats):
+        start_time = time.time()
+        documents = list(chunk_docs.values())
+        # decode base64 & convert float (column-wise per chunk)
+        func_convert.convert_avro_decimal_fields(documents, self.decimal_fields, self.decimal_scale)
+        if self.projector is not None:
+            project = self.projector
+            documents = [project(document) for document in documents]
+        sharding_configs = self.sharding_configs(documents)
+        stats['preprocess_seconds'] += time.time() - start_time
+        return sharding_configs
+
+    def iter_chunks(self, process_id, stream, stats):
+        """Yield sharding configs for every STREAM_CHUNK_DOCS unique docs while the body is still being read (import chunks are sized per collection by the importer)."""
+        # newest version seen per doc ID (whole batch) and the chunk not yet forwarded
+        latest_versions = {}
+        chunk_docs = {}
+
+        # pre-process doc (streamed), parse time excludes prepare_chunk and the consumer between yields
+        start_time = time.time()
+        parse_start_time = start_time
+        for payload in func_stream.iter_json_array(stream, STREAM_READ_BYTES):
+            stats['parsed'] += 1
+
+            # doc ID
+            document_id = self.document_id(payload)
+            payload['id'] = document_id
+
+            # collapse duplicates to the newest version
+            version = payload.get(self.version_field) if self.version_field else None
+            if document_id in latest_versions:
+                if not self.is_newer(version, latest_versions[document_id]):
+                    stats['collapsed'] += 1
+                    continue
+                # an older version still in this chunk is replaced, not re-sent
+                if chunk_docs.pop(document_id, None) is not None:
+                    stats['collapsed'] += 1
+            latest_versions[document_id] = version
+            chunk_docs[document_id] = payload
+
+            # forward chunk
+            if len(chunk_docs) >= STREAM_CHUNK_DOCS:
+                stats['parse_seconds'] += time.time() - parse_start_time
+                yield self.prepare_chunk(chunk_docs, stats)
+                chunk_docs = {}
+                parse_start_time = time.time()
+
+        stats['parse_seconds'] += time.time() - parse_start_time
+        last_chunk = self.prepare_chunk(chunk_docs, stats)
+        log_process_time(start_time, f"[PID:{process_id}] Completed pre-processing {stats['parsed']} docs ({stats['collapsed']} duplicate(s) collapsed)")
+        yield last_chunk
+
+    def raw_field(self, raw, field):
+        return func_stream.raw_field_value(self.raw_patterns[field], raw)
+
+    def prepare_raw_chunk(self, chunk_docs, stats):
+        start_time = time.time()
+        shard_docs = {strategy.name: defaultdict(list) for strategy in self.strategies}
+        for document, timestamp_ms in chunk_docs.values():
+            for strategy in self.strategies:
+                shard_docs[strategy.name][strategy.shard_key(timestamp_ms)].append(document)
+        stats['preprocess_seconds'] += time.time() - start_time
+        return {strategy.name: {"data": shard_docs[strategy.name], "prefix": strategy.prefix} for strategy in self.strategies}
+
+    def iter_raw_chunks(self, process_id, stream, stats):
+        """Passthrough counterpart of iter_chunks: read only id, version and timestamp from each raw document."""
+        body = stream.read() if stream is not None else b''
+        latest_versions = {}
+        chunk_docs = {}
+
+        start_time = time.time()
+        parse_start_time = start_time
+        for raw in func_stream.iter_raw_objects(body):
+            stats['parsed'] += 1
+
+            # doc ID, spliced in front when the upstream document has none
+            document_id = self.raw_field(raw, 'id')
+            if document_id is None:
+                document_id = self.document_id({field: self.raw_field(raw, field) for field in self.id_fields})
+                raw = b'{"id":' + ujson.dumps(document_id).encode() + (b',' if raw[1:].strip() != b'}' else b'') + raw[1:]
+            else:
+                document_id = str(document_id)
+
+            # collapse duplicates to the newest version
+            version = self.raw_field(raw, self.version_field) if self.version_field else None
+            if document_id in latest_versions:
+                if not self.is_newer(version, latest_versions[document_id]):
+                    stats['collapsed'] += 1
+                    continue
+                if chunk_docs.pop(document_id, None) is not None:
+                    stats['collapsed'] += 1
+            latest_versions[document_id] = version
+            chunk_docs[document_id] = (func_json.RawDocument(raw, document_id), self.raw_field(raw, self.timestamp_field))
+
+            # forward chunk
+            if len(chunk_docs) >= STREAM_CHUNK_DOCS:
+                stats['parse_seconds'] += time.time() - parse_start_time
+                yield self.prepare_raw_chunk(chunk_docs, stats)
+                chunk_docs = {}
+                parse_start_time = time.time()
+
+        stats['parse_seconds'] += time.time() - parse_start_time
+        last_chunk = self.prepare_raw_chunk(chunk_docs, stats)
+        log_process_time(start_time, f"[PID:{process_id}] Completed passthrough scan {stats['parsed']} docs ({stats['collapsed']} duplicate(s) collapsed)")
+        yield last_chunk
+
+    def chunks(self, process_id, stream, stats):
+        if stream is not None:
+            stream = CountingStream(stream, stats, MAX_BODY_BYTES)
+        if self.passthrough:
+            return self.iter_raw_chunks(process_id, stream, stats)
+        return self.iter_chunks(process_id, stream, stats)
+
+    def observe_stages(self, stats, shard_seconds):
+        metrics.PARSE_SECONDS.observe(stats['parse_seconds'], endpoint=self.endpoint)
+        metrics.PREPROCESS_SECONDS.observe(stats['preprocess_seconds'], endpoint=self.endpoint)
+        metrics.SHARD_SECONDS.observe(shard_seconds, endpoint=self.endpoint)
+        metrics.DOCUMENTS.inc(stats['parsed'], endpoint=self.endpoint, outcome='parsed')
+        metrics.DOCUMENTS.inc(stats['collapsed'], endpoint=self.endpoint, outcome='collapsed')
+
+    def new_stats(self):
+        return {'parsed': 0, 'collapsed': 0, 'parse_seconds': 0.0, 'preprocess_seconds': 0.0, 'bytes_in': 0, 'too_large': False, 'error_message': None}
+
+    def summarize(self, stats, shard_results, shard_seconds):
+        processed_count = 0
+        errors = []
+        for shard_result in shard_results:
+            processed_count += shard_result['processed']
+            errors.extend(shard_result['errors'])
+
+        # stage breakdown: parse and preprocess overlap the imports already running, shard is the wait after parsing
+        timing = {
+            'parse_seconds': round(stats['parse_seconds'], 4),
+            'preprocess_seconds': round(stats['preprocess_seconds'], 4),
+            'shard_seconds': round(shard_seconds, 4),
+            'parsed': stats['parsed'],
+            'bytes_in': stats['bytes_in'],
+            'bytes_out': sum(shard_result['bytes_out'] for shard_result in shard_results)
+        }
+        return {'processed_count': processed_count, 'collapsed_count': stats['collapsed'], 'errors': errors, 'error_message': stats['error_message'], 'shard_results': shard_results, 'timing': timing, 'too_large': stats['too_large']}
+
+    def forward(self, process_id, stream, stats, shard_importer):
+        """Parse the body and submit its chunks as they fill, yielding after each submit.
+
+        A body that stops early (too large, malformed) ends the loop with stats['error_message'] set;
+        chunks already forwarded still count.
+        """
+        try:
+            for sharding_configs in self.chunks(process_id, stream, stats):
+                shard_importer.submit(sharding_configs)
+                yield
+        except BodyTooLarge as e:
+            # no Content-Length to check up front (chunked body): stopped mid-stream
+            stats['error_message'] = str(e)
+            stats['too_large'] = True
+            logger.warning(f"[PID:{process_id}] {stats['error_message']}")
+        except Exception as e:
+            stats['error_message'] = str(e)
+            logger.error(f"ERROR: {stats['error_message']}", exc_info=True)
+
+    def finish(self, process_id, stats, shard_results, shard_start_time):
+        shard_seconds = time.time() - shard_start_time
+        if stats['error_message'] is None:
+            self.observe_stages(stats, shard_seconds)
+            log_process_time(shard_start_time, f"[PID:{process_id}] Completed upsert SHARD-collection ({', '.join(strategy.name for strategy in self.strategies)})")
+        return self.summarize(stats, shard_results, shard_seconds)
+
+    def run(self, process_id, stream):
+        stats = self.new_stats()
+        shard_importer = ShardImporter(process_id, self.endpoint)
+        for _ in self.forward(process_id, stream, stats, shard_importer):
+            pass
+
+        # import upsert (shards in parallel)
+        shard_start_time = time.time()
+        return self.finish(process_id, stats, shard_importer.wait(), shard_start_time)
+
+    async def run_async(self, process_id, stream):
+        stats = self.new_stats()
+        shard_importer = AsyncShardImporter(process_id, self.endpoint)
+        for _ in self.forward(process_id, stream, stats, shard_importer):
+            # let already forwarded imports start sending while parsing continues
+            await asyncio.sleep(0)
+
+        # import upsert (shards concurrently on the event loop)
+        shard_start_time = time.time()
+        return self.finish(process_id, stats, await shard_importer.wait(), shard_start_time)
+
+pipelines = {endpoint: IngestPipeline(endpoint, config, HOT_SHARDS) for endpoint, config in INGEST_CONFIGS.items()}
+
+def handle_response(process_id, total_start_time, processed_count, errors, error_message=None, status_code=200, shard_results=None, collapsed_count=0, timing=None, too_large=False):
+    # log time
+    total_response_time = time.time() - total_start_time
+    log_message = f'[PID:{process_id}] Total response time: Completed {processed_count} document(s) in {total_response_time:.2f}sec'
+    timing = dict(timing or {}, total_seconds=round(total_response_time, 4))
+
+    # log (structured fields for the JSON log format)
+    logger.info(log_message, extra={'timing': timing, 'shards': [
+        {'collection': shard_result['collection'], 'documents': shard_result['documents'], 'import_seconds': shard_result['import_seconds'], 'bytes_out': shard_result['bytes_out']}
+        for shard_result in shard_results or []
+    ]})
+
+    # response
+    response_data = {'response_time': f'{total_response_time:.2f} seconds', 'collapsed': collapsed_count, 'timing': timing}
+    if shard_results:
+        response_data['shards'] = shard_results
+
+    if too_large:
+        # body over DATA_UPLOAD_MAX_MEMORY_SIZE: the connector has to send smaller batches
+        response_data['status'] = 'error'
+        response_data['message'] = error_message
+        response_data['errors'] = errors
+        status_code = 413
+    elif any(shard_result['failed'] for shard_result in shard_results or []):
+        # a whole import failed (Typesense down, timeout, 503): not delivered, the connector must redeliver
+        response_data['status'] = 'error'
+        response_data['message'] = error_message or log_message
+        response_data['errors'] = errors
+        status_code = 503
+    elif errors:
+        response_data['status'] = 'partial_success'
+        response_data['message'] = log_message
+        response_data['errors'] = errors
+        status_code = 207
+    elif error_message:
+        response_data['status'] = 'error'
+        response_data['message'] = error_message
+        status_code = 500
+    else:
+        response_data['status'] = 'ok'
+        response_data['message'] = log_message
+        status_code = 200
+    return JsonResponse(response_data, status=status_code)
+
+def throttled_response(process_id, total_start_time):
+    # 503 while Typesense itself is failing, 429 while it is only slow
+    limiter_status = import_limiter.status()
+    status_code = 503 if import_limiter.last_failed else 429
+    retry_after = import_limiter.retry_after()
+    log_message = f'[PID:{process_id}] Rejected: {limiter_status["in_flight"]}/{limiter_status["limit"]} ingest request(s) in flight, retry after {retry_after}sec'
+    logger.warning(log_message)
+    response = JsonResponse({'status': 'throttled', 'message': log_message, 'limiter': limiter_status, 'response_time': f'{time.time() - total_start_time:.2f} seconds'}, status=status_code)
+    response['Retry-After'] = str(retry_after)
+    return response
+
+def too_large_response(process_id, total_start_time, message):
+    log_message = f'[PID:{process_id}] Rejected: {message}'
+    logger.warning(log_message)
+    return JsonResponse({'status': 'error', 'message': log_message, 'response_time': f'{time.time() - total_start_time:.2f} seconds'}, status=413)
+
+def declared_too_large(request):
+    # checked before reading, so an oversized body is never buffered
+    content_length = request.META.get('CONTENT_LENGTH')
+    if MAX_BODY_BYTES is None or not content_length or not content_length.isdigit():
+        return None
+    if int(content_length) > MAX_BODY_BYTES:
+        return f"Request body of {content_length} bytes exceeds {MAX_BODY_BYTES} bytes (DATA_UPLOAD_MAX_MEMORY_SIZE)"
+    return None
+
+def run_spooled_batch(process_id, endpoint, body):
+    return pipelines[endpoint].run(process_id, io.BytesIO(body))
+
+spool_writer = spool.SpoolWriter()
+spool_drainer = spool.SpoolDrainer(spool_writer, run_spooled_batch)
+
+def start_spool():
+    # replays segments left by a previous run, then follows new appends
+    if ASYNC_ENDPOINTS:
+        spool_drainer.start()
+
+def spool_ingest(process_id, endpoint, stream, total_start_time, received):
+    try:
+        body = CountingStream(stream, received, MAX_BODY_BYTES).read() if stream is not None else b''
+    except BodyTooLarge as e:
+        return too_large_response(process_id, total_start_time, str(e))
+    if not body.lstrip().startswith(b'['):
+        return handle_response(process_id, total_start_time=total_start_time, processed_count=0, errors=[], error_message='Expected JSON array body')
+
+    start_spool()
+    segment, offset = spool_writer.append(endpoint, body)
+    total_response_time = time.time() - total_start_time
+    log_message = f'[PID:{process_id}] Spooled {len(body)} bytes to {segment}@{offset} in {total_response_time:.2f}sec'
+    logger.info(log_message)
+    return JsonResponse({'status': 'accepted', 'message': log_message, 'segment': segment, 'offset': offset, 'response_time': f'{total_response_time:.2f} seconds'}, status=202)
+
+def api_key_name(request):
+    # set by TypesenseKeyAuth (request.auth), one name per connector key
+    return getattr(request, 'auth', None) or 'unknown'
+
+def observe_request(endpoint, request, response, total_start_time, received):
+    metrics.RESPONSE_SECONDS.observe(time.time() - total_start_time, endpoint=endpoint, status=str(response.status_code))
+    # bytes actually read: a declared Content-Length may be missing (chunked), rejected or cut off
+    metrics.REQUEST_BYTES.inc(received['bytes_in'], endpoint=endpoint)
+    metrics.KEY_REQUESTS.inc(key=api_key_name(request), endpoint=endpoint, status=str(response.status_code))
+    return response
+
+async def run_ingest_async(process_id, endpoint, request, total_start_time, received):
+    too_large = declared_too_large(request)
+    if too_large:
+        return too_large_response(process_id, total_start_time, too_large)
+    if endpoint in ASYNC_ENDPOINTS:
+        return await sync_to_async(spool_ingest)(process_id, endpoint, request, total_start_time, received)
+
+    if LIMIT_ENABLED and not import_limiter.try_acquire():
+        return throttled_response(process_id, total_start_time)
+    try:
+        # ASGI requests are fully received before the view, read them as a file
+        result = await pipelines[endpoint].run_async(process_id, request)
+    finally:
+        if LIMIT_ENABLED:
+            import_limiter.release()
+    received['bytes_in'] = result['timing']['bytes_in']
+    metrics.KEY_DOCUMENTS.inc(result['timing']['parsed'], key=api_key_name(request), endpoint=endpoint)
+    return handle_response(process_id, total_start_time=total_start_time, **result)
+
+def run_ingest(process_id, endpoint, request, total_start_time, received):
+    too_large = declared_too_large(request)
+    if too_large:
+        return too_large_response(process_id, total_start_time, too_large)
+    if endpoint in ASYNC_ENDPOINTS:
+        return spool_ingest(process_id, endpoint, request.stream, total_start_time, received)
+
+    # shed load before reading the body, the spool path above absorbs bursts on its own
+    if LIMIT_ENABLED and not import_limiter.try_acquire():
+        return throttled_response(process_id, total_start_time)
+    try:
+        result = pipelines[endpoint].run(process_id, request.stream)
+    finally:
+        if LIMIT_ENABLED:
+            import_limiter.release()
+    received['bytes_in'] = result['timing']['bytes_in']
+    metrics.KEY_DOCUMENTS.inc(result['timing']['parsed'], key=api_key_name(request), endpoint=endpoint)
+    return handle_response(process_id, total_start_time=total_start_time, **result)
+
+async def ingest_async(endpoint, request):
+    process_id = uuid.uuid4()
+    total_start_time = time.time()
+    received = {'bytes_in': 0}
+    profile = profiler_state.start_request(endpoint, process_id)
+    try:
+        async with func_client.async_client_scope():
+            response = await run_ingest_async(process_id, endpoint, request, total_start_time, received)
+    finally:
+        if profile is not None:
+            profile.stop()
+    return observe_request(endpoint, request, response, total_start_time, received)
+
+def ingest(endpoint, request):
+    process_id = uuid.uuid4()
+    total_start_time = time.time()
+    received = {'bytes_in': 0}
+    profile = profiler_state.start_request(endpoint, process_id)
+    try:
+        response = run_ingest(process_id, endpoint, request, total_start_time, received)
+    finally:
+        if profile is not None:
+            profile.stop()
+    return observe_request(endpoint, request, response, total_start_time, received)
@@ -0,0 +1,204 @@
+import os
+import re
+import sys
+import time
+import random
+import logging
+import cProfile
+import threading
+from collections import Counter
+
+from utils.func_client import env_bool, env_float
+
+# logger
+logger = logging.getLogger(__name__)
+
+# profiling settings (opt-in, off unless enabled)
+PROFILE_ENABLED = env_bool('TYPESENSE_PROFILE_ENABLED', False)
+PROFILE_SAMPLE_RATE = env_float('TYPESENSE_PROFILE_SAMPLE_RATE', 0)
+PROFILE_MODE = os.environ.get('TYPESENSE_PROFILE_MODE', 'sample')
+PROFILE_INTERVAL_SECONDS = env_float('TYPESENSE_PROFILE_INTERVAL_MS', 5) / 1000
+PROFILE_MAX_WINDOW_SECONDS = env_float('TYPESENSE_PROFILE_MAX_WINDOW_SECONDS', 300)
+PROFILE_DIR = os.environ.get('TYPESENSE_PROFILE_DIR', '/app/temp/profile')
+
+# pool threads are numbered, one flame per pool
+THREAD_NUMBER = re.compile(r'_\d+$')
+IDLE_POOL_FILE = os.path.join('concurrent', 'futures', 'thread.py')
+
+
+def collapse_stack(frame):
+    # root first, as flamegraph.pl / speedscope folded stacks expect
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class StackSampler:
+    """Samples the stacks of selected threads every `interval_seconds` into folded-stack counts.
+
+    Each stack is rooted at its thread name, so request threads, import pool and background threads
+    (retry, coalescer, spool) show up as separate flames.
+    """
+
+    def __init__(self, interval_seconds, thread_filter=None):
+        self.interval_seconds = interval_seconds
+        self.thread_filter = thread_filter
+        self.counts = Counter()
+        self.samples = 0
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.loop, name='typesense_profiler', daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def loop(self):
+        own_id = threading.get_ident()
+        while not self.stopped.wait(self.interval_seconds):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                # idle pool workers block in C inside ThreadPoolExecutor's _worker, not worth a flame
+                if frame.f_code.co_name == '_worker' and frame.f_code.co_filename.endswith(IDLE_POOL_FILE):
+                    continue
+                name = names.get(thread_id, str(thread_id))
+                if self.thread_filter is None or self.thread_filter(thread_id, name):
+                    self.counts[f'{THREAD_NUMBER.sub("", name)};{collapse_stack(frame)}'] += 1
+            self.samples += 1
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+        return self.counts
+
+    def write(self, path):
+        with open(path, 'w') as f:
+            for stack, count in self.counts.most_common():
+                f.write(f'{stack} {count}\n')
+
+
+class RequestProfile:
+    """Profile of one ingest request: its own thread plus the shard import pool while it runs."""
+
+    def __init__(self, endpoint, process_id, mode):
+        self.endpoint = endpoint
+        self.process_id = process_id
+        self.mode = mode
+        self.start_time = time.time()
+        if mode == 'cprofile':
+            # deterministic, request thread only (parse/preprocess and the wait on imports)
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        else:
+            request_thread = threading.get_ident()
+            self.profiler = StackSampler(PROFILE_INTERVAL_SECONDS, lambda thread_id, name: thread_id == request_thread or name.startswith('typesense_import')).start()
+
+    def stop(self):
+        try:
+            # stop sampling first, whatever happens to the file
+            if self.mode == 'cprofile':
+                self.profiler.disable()
+            else:
+                self.profiler.stop()
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            path = os.path.join(PROFILE_DIR, f"{time.strftime('%Y%m%d-%H%M%S', time.localtime(self.start_time))}_{self.endpoint}_{self.process_id}")
+            if self.mode == 'cprofile':
+                path += '.prof'
+                self.profiler.dump_stats(path)
+            else:
+                path += '.folded'
+                self.profiler.write(path)
+            logger.info(f"[PID:{self.process_id}] Profile written to {path} ({time.time() - self.start_time:.2f}sec)")
+        except Exception as e:
+            logger.error(f"[PID:{self.process_id}] ERROR writing profile: {e}", exc_info=True)
+        finally:
+            profiler_state.release()
+
+
+class ProfilerState:
+    """Per-process switch: sampled requests (env rate) and on-demand sampling windows, one profile at a time."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.busy = False
+        self.window = None
+
+    def acquire(self):
+        with self.lock:
+            if self.busy:
+                return False
+            self.busy = True
+            return True
+
+    def release(self):
+        with self.lock:
+            self.busy = False
+
+    def start_request(self, endpoint, process_id):
+        # the only cost on the hot path when profiling is off is this check
+        if not PROFILE_ENABLED or PROFILE_SAMPLE_RATE <= 0 or random.random() >= PROFILE_SAMPLE_RATE:
+            return None
+        try:
+            # a bad PROFILE_DIR must not leave the profiler busy or a sampler running
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+        except OSError as e:
+            logger.error(f"[PID:{process_id}] ERROR creating profile dir {PROFILE_DIR}: {e}")
+            return None
+        if not self.acquire():
+            return None
+        try:
+            return RequestProfile(endpoint, process_id, PROFILE_MODE)
+        except Exception:
+            self.release()
+            raise
+
+    def start_window(self, seconds):
+        """Sample every thread of this worker for `seconds`, written as one folded-stack file."""
+        seconds = min(max(float(seconds), 0.1), PROFILE_MAX_WINDOW_SECONDS)
+        # before acquiring: an OSError here leaves nothing busy or running
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        if not self.acquire():
+            return None
+        try:
+            sampler = StackSampler(PROFILE_INTERVAL_SECONDS, lambda thread_id, name: name != 'typesense_profiler_window').start()
+        except Exception:
+            self.release()
+            raise
+        path = os.path.join(PROFILE_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}_window_{os.getpid()}.folded")
+        self.window = {'path': path, 'seconds': seconds, 'until': time.time() + seconds}
+
+        def finish():
+            try:
+                sampler.stop()
+                sampler.write(path)
+                logger.info(f"Profile window written to {path} ({sampler.samples} samples)")
+            except Exception as e:
+                logger.error(f"ERROR writing profile window: {e}", exc_info=True)
+            finally:
+                self.window = None
+                self.release()
+
+        timer = threading.Timer(seconds, finish)
+        timer.name = 'typesense_profiler_window'
+        timer.daemon = True
+        timer.start()
+        return dict(self.window)
+
+    def status(self):
+        files = sorted(os.listdir(PROFILE_DIR))[-20:] if os.path.isdir(PROFILE_DIR) else []
+        return {
+            'enabled': PROFILE_ENABLED,
+            'sample_rate': PROFILE_SAMPLE_RATE,
+            'mode': PROFILE_MODE,
+            'interval_ms': PROFILE_INTERVAL_SECONDS * 1000,
+            'busy': self.busy,
+            'window': self.window,
+            'pid': os.getpid(),
+            'files': files
+        }
+
+profiler_state = ProfilerState()
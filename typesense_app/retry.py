@@ -0,0 +1,130 @@
+import os
+import re
+import json
+import time
+import random
+import logging
+import threading
+
+from utils import func_json
+from utils.func_client import env_bool, env_float, env_int
+
+# logger
+logger = logging.getLogger(__name__)
+
+# retry settings
+RETRY_ENABLED = env_bool('TYPESENSE_RETRY_ENABLED', True)
+RETRY_MAX_ATTEMPTS = env_int('TYPESENSE_RETRY_MAX_ATTEMPTS', 5)
+RETRY_BASE_SECONDS = env_float('TYPESENSE_RETRY_BASE_SECONDS', 1)
+RETRY_MAX_SECONDS = env_float('TYPESENSE_RETRY_MAX_SECONDS', 60)
+RETRY_BATCH_DOCS = env_int('TYPESENSE_RETRY_BATCH_DOCS', 1000)
+RETRY_MAX_DOCS = env_int('TYPESENSE_RETRY_MAX_DOCS', 100000)
+DEAD_LETTER_DIR = os.environ.get('TYPESENSE_DEAD_LETTER_DIR', '/app/temp/dead_letter')
+
+# per-document errors worth retrying (node busy or lagging), everything else is a bad document
+TRANSIENT_ERROR = re.compile(r'time[ds]? ?out|not ready|lagging|queue|too many|rate limit|unavailable|connection (refused|reset|aborted)|max retries exceeded|\b(408|429|502|503|504)\b', re.IGNORECASE)
+
+
+def classify_error(error):
+    return 'transient' if error and TRANSIENT_ERROR.search(error) else 'permanent'
+
+
+class RetryQueue:
+    """Local retry queue for documents an import_ rejected one by one.
+
+    Transient failures are re-imported in per-collection batches after a jittered exponential backoff;
+    permanent ones (schema/validation), exhausted retries and queue overflow go to a dead-letter file
+    per collection. A later successful import of the same document drops its pending retry, so an
+    older version is never written over a newer one.
+    """
+
+    def __init__(self, import_documents, dead_letter_dir=DEAD_LETTER_DIR):
+        self.import_documents = import_documents
+        self.dead_letter_dir = dead_letter_dir
+        self.condition = threading.Condition()
+        self.dead_letter_lock = threading.Lock()
+        self.pending = {}
+        self.thread = None
+
+    def backoff(self, attempts):
+        delay = min(RETRY_BASE_SECONDS * (2 ** (attempts - 1)), RETRY_MAX_SECONDS)
+        return delay * random.uniform(0.5, 1.5)
+
+    def add(self, collection_name, failures, attempts=1):
+        """Queue or dead-letter (document, error) pairs; returns (retrying, dead_lettered) counts."""
+        retrying = []
+        dead_letters = []
+        with self.condition:
+            for document, error in failures:
+                if classify_error(error) == 'permanent' or attempts > RETRY_MAX_ATTEMPTS:
+                    dead_letters.append((document, error))
+                elif len(self.pending) >= RETRY_MAX_DOCS:
+                    dead_letters.append((document, f'retry queue full: {error}'))
+                else:
+                    self.pending[(collection_name, func_json.document_id(document))] = (document, error, attempts, time.monotonic() + self.backoff(attempts))
+                    retrying.append(document)
+            if retrying:
+                if self.thread is None:
+                    self.thread = threading.Thread(target=self.loop, name='typesense_retry', daemon=True)
+                    self.thread.start()
+                self.condition.notify()
+
+        if dead_letters:
+            self.dead_letter(collection_name, dead_letters, attempts)
+        return len(retrying), len(dead_letters)
+
+    def discard(self, collection_name, document_ids):
+        # a newer successful write supersedes the queued retry
+        if not self.pending:
+            return
+        with self.condition:
+            for document_id in document_ids:
+                self.pending.pop((collection_name, document_id), None)
+
+    def dead_letter(self, collection_name, failures, attempts):
+        logger.error(f"Dead-lettered {len(failures)} document(s) of {collection_name}: {failures[0][1]}")
+        try:
+            with self.dead_letter_lock:
+                os.makedirs(self.dead_letter_dir, exist_ok=True)
+                with open(os.path.join(self.dead_letter_dir, f'{collection_name}.jsonl'), 'a') as f:
+                    for document, error in failures:
+                        f.write(json.dumps({'collection': collection_name, 'id': func_json.document_id(document), 'error': error, 'attempts': attempts, 'time': time.time(), 'document': func_json.as_dict(document)}) + '\n')
+        except Exception as e:
+            logger.error(f"ERROR: dead-letter write failed for {collection_name}: {e}", exc_info=True)
+
+    def take_due(self):
+        # due documents grouped per collection, at most RETRY_BATCH_DOCS per batch
+        now = time.monotonic()
+        batches = {}
+        next_due = None
+        for key, (document, error, attempts, due) in list(self.pending.items()):
+            if due > now:
+                next_due = due if next_due is None else min(next_due, due)
+                continue
+            batch = batches.setdefault((key[0], attempts), [])
+            if len(batch) < RETRY_BATCH_DOCS:
+                batch.append(document)
+                del self.pending[key]
+        return batches, next_due
+
+    def loop(self):
+        while True:
+            with self.condition:
+                batches, next_due = self.take_due()
+                if not batches:
+                    self.condition.wait(None if next_due is None else max(next_due - time.monotonic(), 0))
+                    continue
+            for (collection_name, attempts), documents in batches.items():
+                self.retry(collection_name, documents, attempts)
+
+    def retry(self, collection_name, documents, attempts):
+        try:
+            response = self.import_documents(collection_name, documents)
+        except Exception as e:
+            # the whole import failed, every document stays transient
+            response = [{'success': False, 'error': f'timeout or unavailable: {e}'}] * len(documents)
+
+        failures = [(document, doc_response.get('error')) for document, doc_response in zip(documents, response) if not doc_response['success']]
+        if failures:
+            self.add(collection_name, failures, attempts + 1)
+        logger.info(f"Retried {len(documents)} document(s) of {collection_name} (attempt {attempts}): {len(documents) - len(failures)} succeeded")
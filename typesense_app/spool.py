@@ -0,0 +1,190 @@
+import os
+import time
+import uuid
+import zlib
+import fcntl
+import struct
+import logging
+import threading
+
+# logger
+logger = logging.getLogger(__name__)
+
+# spool settings
+SPOOL_DIR = os.environ.get('TYPESENSE_SPOOL_DIR', '/app/temp/spool')
+SPOOL_SEGMENT_BYTES = int(os.environ.get('TYPESENSE_SPOOL_SEGMENT_BYTES', 64 * 1024 * 1024))
+SPOOL_POLL_SECONDS = float(os.environ.get('TYPESENSE_SPOOL_POLL_SECONDS', 1))
+SPOOL_RETRY_MAX_SECONDS = float(os.environ.get('TYPESENSE_SPOOL_RETRY_MAX_SECONDS', 60))
+
+# record: endpoint length, body length, crc32(body), endpoint, body
+RECORD_HEADER = struct.Struct('>HII')
+
+
+class SpoolWriter:
+    """Appends ingest batches to this process's own segment file, fsynced before the 202 ack."""
+
+    def __init__(self, spool_dir=SPOOL_DIR, segment_bytes=SPOOL_SEGMENT_BYTES):
+        self.spool_dir = spool_dir
+        self.segment_bytes = segment_bytes
+        self.lock = threading.Lock()
+        self.file = None
+        self.path = None
+        self.appended = threading.Event()
+
+    def open_segment(self):
+        os.makedirs(self.spool_dir, exist_ok=True)
+        if self.file is not None:
+            self.file.close()
+            # sealed segments are deleted by the drainer once checkpointed to the end
+            open(self.path + '.sealed', 'w').close()
+        # time-ordered names, pid marks the owner of an unsealed segment
+        self.path = os.path.join(self.spool_dir, f'{time.time_ns():020d}_{os.getpid()}.seg')
+        self.file = open(self.path, 'ab')
+
+    def append(self, endpoint, body):
+        endpoint_bytes = endpoint.encode('utf-8')
+        record = RECORD_HEADER.pack(len(endpoint_bytes), len(body), zlib.crc32(body)) + endpoint_bytes + body
+        with self.lock:
+            if self.file is None or self.file.tell() >= self.segment_bytes:
+                self.open_segment()
+            offset = self.file.tell()
+            self.file.write(record)
+            self.file.flush()
+            os.fsync(self.file.fileno())
+            segment = os.path.basename(self.path)
+        self.appended.set()
+        return segment, offset
+
+
+def read_records(path, offset):
+    # yields (endpoint, body, next_offset), stops at a torn or partial tail record
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        while True:
+            header = f.read(RECORD_HEADER.size)
+            if len(header) < RECORD_HEADER.size:
+                return
+            endpoint_length, body_length, crc = RECORD_HEADER.unpack(header)
+            endpoint = f.read(endpoint_length)
+            body = f.read(body_length)
+            if len(endpoint) < endpoint_length or len(body) < body_length or zlib.crc32(body) != crc:
+                return
+            offset = f.tell()
+            yield endpoint.decode('utf-8'), body, offset
+
+def read_checkpoint(path):
+    try:
+        with open(path + '.ckpt') as f:
+            return int(f.read().strip() or 0)
+    except FileNotFoundError:
+        return 0
+
+def write_checkpoint(path, offset):
+    tmp_path = path + '.ckpt.tmp'
+    with open(tmp_path, 'w') as f:
+        f.write(str(offset))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path + '.ckpt')
+
+def owner_alive(segment_name):
+    pid = int(segment_name.rsplit('_', 1)[1].split('.')[0])
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+        return True
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+
+
+class SpoolDrainer:
+    """Replays spooled batches into Typesense, one process per spool dir (flock), checkpointing each record."""
+
+    def __init__(self, writer, run_batch, spool_dir=SPOOL_DIR):
+        self.writer = writer
+        self.run_batch = run_batch
+        self.spool_dir = spool_dir
+        self.thread = None
+        self.lock_file = None
+        self.retry_seconds = 0
+
+    def start(self):
+        if self.thread is not None:
+            return
+        self.thread = threading.Thread(target=self.loop, name='typesense_spool_drainer', daemon=True)
+        self.thread.start()
+
+    def acquire_lock(self):
+        os.makedirs(self.spool_dir, exist_ok=True)
+        self.lock_file = open(os.path.join(self.spool_dir, 'drainer.lock'), 'w')
+        while True:
+            try:
+                fcntl.flock(self.lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return
+            except BlockingIOError:
+                # another process drains this spool, take over if it exits
+                time.sleep(SPOOL_POLL_SECONDS * 5)
+
+    def loop(self):
+        self.acquire_lock()
+        logger.info(f"Spool drainer started on {self.spool_dir}")
+        while True:
+            try:
+                progressed = self.drain_once()
+            except Exception as e:
+                logger.error(f"ERROR: spool drain failed: {e}", exc_info=True)
+                progressed = False
+
+            if self.retry_seconds:
+                time.sleep(self.retry_seconds)
+            elif not progressed:
+                self.writer.appended.wait(SPOOL_POLL_SECONDS)
+                self.writer.appended.clear()
+
+    def drain_once(self):
+        progressed = False
+        segment_names = sorted(name for name in os.listdir(self.spool_dir) if name.endswith('.seg'))
+        for segment_name in segment_names:
+            path = os.path.join(self.spool_dir, segment_name)
+            offset = read_checkpoint(path)
+            for endpoint, body, next_offset in read_records(path, offset):
+                if not self.replay(segment_name, offset, endpoint, body):
+                    # keep order: stop here and retry this record after backoff
+                    return progressed
+                write_checkpoint(path, next_offset)
+                offset = next_offset
+                progressed = True
+
+            # fully drained and no longer written to
+            writer_done = os.path.exists(path + '.sealed') or not owner_alive(segment_name)
+            if writer_done and offset == os.path.getsize(path):
+                for suffix in ('', '.ckpt', '.sealed'):
+                    if os.path.exists(path + suffix):
+                        os.remove(path + suffix)
+                logger.info(f"Spool segment {segment_name} drained and removed")
+        return progressed
+
+    def replay(self, segment_name, offset, endpoint, body):
+        process_id = uuid.uuid4()
+        result = self.run_batch(process_id, endpoint, body)
+
+        if result['error_message']:
+            # the batch itself is unusable (bad JSON, missing id field), retrying cannot help
+            logger.error(f"[PID:{process_id}] Spool record {segment_name}@{offset} ({endpoint}) rejected: {result['error_message']}")
+            rejected_dir = os.path.join(self.spool_dir, 'rejected')
+            os.makedirs(rejected_dir, exist_ok=True)
+            with open(os.path.join(rejected_dir, f'{segment_name}_{offset}_{endpoint}.json'), 'wb') as f:
+                f.write(body)
+            self.retry_seconds = 0
+            return True
+        if any(shard_result['failed'] for shard_result in result['shard_results']):
+            self.retry_seconds = min(max(self.retry_seconds * 2, 1), SPOOL_RETRY_MAX_SECONDS)
+            logger.warning(f"[PID:{process_id}] Spool record {segment_name}@{offset} ({endpoint}) import failed, retrying in {self.retry_seconds:.0f}sec")
+            return False
+
+        self.retry_seconds = 0
+        logger.info(f"[PID:{process_id}] Spool record {segment_name}@{offset} ({endpoint}) replayed: {result['processed_count']} document(s), {len(result['errors'])} error(s)", extra={'timing': result['timing']})
+        return True
@@ -1,3 +1,755 @@
-from django.test import TestCase
+import io
+import os
+import random
+import asyncio
+import json
+import tempfile
+import threading
+import time
+from datetime import date, datetime, timedelta
+from zoneinfo import ZoneInfo
+from unittest import mock
 
-# Create your tests here.
+from django.test import RequestFactory, SimpleTestCase
+
+import httpx
+import typesense
+from rest_framework.request import Request
+from typesense.exceptions import ObjectNotFound, ServiceUnavailable
+
+from typesense_app import collection_cache, importer, metrics, pipeline, profiling, spool
+from typesense_app.chunking import AdaptiveChunkSizer, ChunkBuffer
+from typesense_app.retry import classify_error
+from utils import func_client, func_cluster, func_convert, func_schema, func_shard
+from utils.fake_typesense import FakeCluster
+from utils.func_bench import encode_amount
+from utils.func_stream import iter_json_array
+
+
+def parse(body, chunk_size):
+    return list(iter_json_array(io.BytesIO(body), chunk_size=chunk_size))
+
+def transaction_pipeline(passthrough=False):
+    with mock.patch.object(pipeline, 'PASSTHROUGH_ENDPOINTS', {'transaction'} if passthrough else set()):
+        return pipeline.IngestPipeline('transaction', pipeline.INGEST_CONFIGS['transaction'])
+
+def chunk_documents(ingest_pipeline, documents):
+    # {collection key: [document, ...]} per forwarded chunk, without importing
+    stats = ingest_pipeline.new_stats()
+    body = documents if isinstance(documents, bytes) else json.dumps(documents).encode()
+    chunks = [
+        {key: list(docs) for key, docs in sharding_configs['YYYYMM']['data'].items()}
+        for sharding_configs in ingest_pipeline.chunks('test', io.BytesIO(body), stats)
+    ]
+    return chunks, stats
+
+# 2023-11-15 and 2023-12-15 (Asia/Kuala_Lumpur)
+NOVEMBER_MS = 1700000000000
+DECEMBER_MS = 1702600000000
+
+
+class IterJsonArrayTests(SimpleTestCase):
+    """Elements must come out the same whatever the chunk boundaries are."""
+
+    def test_multibyte_utf8_split_across_chunks(self):
+        documents = [{'BILLING_NAME': 'Łukasz 日本 😀', 'CUR_ACTUAL': 'MYR'}, {'BILLING_NAME': 'ñandú'}]
+        body = json.dumps(documents, ensure_ascii=False).encode('utf-8')
+        for chunk_size in range(1, 9):
+            with self.subTest(chunk_size=chunk_size):
+                self.assertEqual(parse(body, chunk_size), documents)
+
+    def test_numbers_cut_mid_token(self):
+        body = b'[12345, -6.5e10, 0.125, 7, true, null]'
+        for chunk_size in range(1, 9):
+            with self.subTest(chunk_size=chunk_size):
+                self.assertEqual(parse(body, chunk_size), [12345, -6.5e10, 0.125, 7, True, None])
+
+    def test_number_as_last_element(self):
+        for chunk_size in (1, 2, 3):
+            with self.subTest(chunk_size=chunk_size):
+                self.assertEqual(parse(b'[1, 23456]', chunk_size), [1, 23456])
+
+    def test_whitespace_around_array(self):
+        for chunk_size in (1, 4):
+            with self.subTest(chunk_size=chunk_size):
+                self.assertEqual(parse(b' \n[ {"a": 1} ,\n{"b": 2} ]\r\n ', chunk_size), [{'a': 1}, {'b': 2}])
+                self.assertEqual(parse(b'[]', chunk_size), [])
+
+    def test_malformed_arrays(self):
+        bodies = [b'', b'   ', b'{"a": 1}', b'[1 2]', b'[1,]', b'[,1]', b'[1', b'[{"a": 1}', b'[{"a": 1]', b'["abc]']
+        for body in bodies:
+            for chunk_size in (1, 3, 65536):
+                with self.subTest(body=body, chunk_size=chunk_size):
+                    with self.assertRaises(ValueError):
+                        parse(body, chunk_size)
+
+    def test_trailing_content_after_array(self):
+        for body in (b'[1]x', b'[1] ,', b'[1][2]', b'[]  {"a": 1}'):
+            for chunk_size in (1, 2, 65536):
+                with self.subTest(body=body, chunk_size=chunk_size):
+                    with self.assertRaises(ValueError):
+                        parse(body, chunk_size)
+
+
+class SpoolTests(SimpleTestCase):
+    """Segments survive torn writes, replay each record once and are removed only when done."""
+
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.spool_dir = temp_dir.name
+        self.replayed = []
+        self.failing = set()
+
+    def run_batch(self, process_id, endpoint, body):
+        if body in self.failing:
+            return {'error_message': None, 'shard_results': [{'failed': True}], 'processed_count': 0, 'errors': [], 'timing': {}}
+        self.replayed.append((endpoint, body))
+        return {'error_message': None, 'shard_results': [{'failed': False}], 'processed_count': 1, 'errors': [], 'timing': {}}
+
+    def segments(self):
+        return sorted(name for name in os.listdir(self.spool_dir) if name.endswith('.seg'))
+
+    def test_torn_tail_is_not_read(self):
+        writer = spool.SpoolWriter(self.spool_dir)
+        offsets = [writer.append('transaction', f'[{{"TRANID": {index}}}]'.encode())[1] for index in range(3)]
+        path = writer.path
+        size = os.path.getsize(path)
+        complete = [b'[{"TRANID": 0}]', b'[{"TRANID": 1}]']
+
+        # crash mid-append of the last record: body, endpoint or header cut short
+        for length in (size - 1, size - 5, offsets[2] + spool.RECORD_HEADER.size + 3, offsets[2] + 4):
+            with self.subTest(length=length):
+                with open(path, 'r+b') as f:
+                    f.truncate(length)
+                self.assertEqual([body for _, body, _ in spool.read_records(path, 0)], complete)
+
+        # complete but corrupted body: the crc mismatch ends the read as well
+        with open(path, 'r+b') as f:
+            f.truncate(offsets[2])
+        writer.append('transaction', b'[{"TRANID": 2}]')
+        with open(path, 'r+b') as f:
+            f.seek(-2, os.SEEK_END)
+            f.write(b'X')
+        self.assertEqual([body for _, body, _ in spool.read_records(path, 0)], complete)
+
+    def test_records_replayed_exactly_once_from_checkpoint(self):
+        writer = spool.SpoolWriter(self.spool_dir)
+        bodies = [f'[{{"TRANID": {index}}}]'.encode() for index in range(4)]
+        for body in bodies[:3]:
+            writer.append('transaction', body)
+
+        # import of the second record fails: order kept, nothing after it is replayed
+        self.failing.add(bodies[1])
+        drainer = spool.SpoolDrainer(writer, self.run_batch, self.spool_dir)
+        self.assertTrue(drainer.drain_once())
+        self.assertEqual(self.replayed, [('transaction', bodies[0])])
+
+        self.failing.clear()
+        drainer.drain_once()
+        drainer.drain_once()
+        self.assertEqual(self.replayed, [('transaction', body) for body in bodies[:3]])
+
+        # restarted drainer resumes from the checkpoint
+        writer.append('status_count_mins', bodies[3])
+        self.assertTrue(spool.SpoolDrainer(writer, self.run_batch, self.spool_dir).drain_once())
+        self.assertEqual(self.replayed, [('transaction', body) for body in bodies[:3]] + [('status_count_mins', bodies[3])])
+        self.assertEqual(spool.read_checkpoint(writer.path), os.path.getsize(writer.path))
+
+    def test_only_sealed_drained_segments_removed(self):
+        # tiny segments: every append after the first rolls over and seals the previous one
+        writer = spool.SpoolWriter(self.spool_dir, segment_bytes=1)
+        drainer = spool.SpoolDrainer(writer, self.run_batch, self.spool_dir)
+        first_segment, _ = writer.append('transaction', b'[1]')
+
+        # drained but still written to by this process
+        drainer.drain_once()
+        self.assertEqual(self.segments(), [first_segment])
+
+        # sealed but not drained yet
+        self.failing.add(b'[1]')
+        self.replayed.clear()
+        os.remove(os.path.join(self.spool_dir, first_segment + '.ckpt'))
+        second_segment, _ = writer.append('transaction', b'[2]')
+        drainer.drain_once()
+        self.assertEqual(self.segments(), [first_segment, second_segment])
+
+        # sealed and drained: removed with its checkpoint and seal marker, the open segment stays
+        self.failing.clear()
+        drainer.drain_once()
+        self.assertEqual(self.replayed, [('transaction', b'[1]'), ('transaction', b'[2]')])
+        self.assertEqual(self.segments(), [second_segment])
+        self.assertFalse(any(name.startswith(first_segment) for name in os.listdir(self.spool_dir)))
+
+    def test_segment_of_exited_writer_removed_when_drained(self):
+        writer = spool.SpoolWriter(self.spool_dir)
+        writer.append('transaction', b'[1]')
+        writer.file.close()
+        # unsealed segment whose owner pid no longer exists
+        orphan_path = os.path.join(self.spool_dir, '00000000000000000001_999999999.seg')
+        os.rename(writer.path, orphan_path)
+
+        spool.SpoolDrainer(writer, self.run_batch, self.spool_dir).drain_once()
+        self.assertEqual(self.replayed, [('transaction', b'[1]')])
+        self.assertEqual(self.segments(), [])
+
+
+class PassthroughTests(SimpleTestCase):
+    """Raw documents keep their bytes, get an id spliced in and are collapsed like parsed ones."""
+
+    def test_id_spliced_and_raw_bytes_kept(self):
+        chunks, stats = chunk_documents(transaction_pipeline(passthrough=True), b'[{"TRANID": 7, "CREATE_DATE": 1700000000000, "NOTE": "caf\\u00e9"}]')
+        document = chunks[-1]['202311'][0]
+        self.assertEqual(document.id, '7')
+        self.assertEqual(bytes(document), b'{"id":"7","TRANID": 7, "CREATE_DATE": 1700000000000, "NOTE": "caf\\u00e9"}')
+        self.assertEqual(stats['parsed'], 1)
+
+    def test_upstream_id_kept(self):
+        chunks, _ = chunk_documents(transaction_pipeline(passthrough=True), b'{"id": "x1", "TRANID": 7, "CREATE_DATE": 1700000000000}\n')
+        document = chunks[-1]['202311'][0]
+        self.assertEqual((document.id, bytes(document)), ('x1', b'{"id": "x1", "TRANID": 7, "CREATE_DATE": 1700000000000}'))
+
+    def test_duplicates_collapsed_to_newest(self):
+        documents = [
+            {'TRANID': 1, 'CREATE_DATE': NOVEMBER_MS, 'UPDATE_DATE': 2, 'STATUS': 'new'},
+            {'TRANID': 1, 'CREATE_DATE': NOVEMBER_MS, 'UPDATE_DATE': 1, 'STATUS': 'old'},
+            {'TRANID': 2, 'CREATE_DATE': DECEMBER_MS, 'UPDATE_DATE': 1}
+        ]
+        chunks, stats = chunk_documents(transaction_pipeline(passthrough=True), documents)
+        self.assertEqual([json.loads(document)['STATUS'] for document in chunks[-1]['202311']], ['new'])
+        self.assertEqual([document.id for document in chunks[-1]['202312']], ['2'])
+        self.assertEqual(stats['collapsed'], 1)
+
+    def test_missing_id_field_rejected(self):
+        # must not become the id "None" and collapse every such document into one
+        for body in (b'[{"CREATE_DATE": 1700000000000}, {"CREATE_DATE": 1700000000001}]', b'[{"TRANID": null, "CREATE_DATE": 1700000000000}]'):
+            with self.subTest(body=body):
+                with self.assertRaisesRegex(ValueError, 'TRANID'):
+                    chunk_documents(transaction_pipeline(passthrough=True), body)
+
+    def test_missing_id_field_fails_the_request(self):
+        for passthrough in (True, False):
+            with self.subTest(passthrough=passthrough):
+                result = transaction_pipeline(passthrough).run('test', io.BytesIO(b'[{"CREATE_DATE": 1700000000000}]'))
+                self.assertIn('TRANID', result['error_message'])
+                self.assertEqual(pipeline.handle_response('test', 0, **result).status_code, 500)
+
+    def test_nested_objects_rejected(self):
+        for body in (b'[{"TRANID": 1, "CREATE_DATE": 1700000000000, "meta": {"TRANID": 2}}]', b'{"TRANID": 1, "meta": {"id": "x"}}\n'):
+            with self.subTest(body=body):
+                with self.assertRaises(ValueError):
+                    chunk_documents(transaction_pipeline(passthrough=True), body)
+
+
+class ProjectorTests(SimpleTestCase):
+    """compile_projector: schema fields only, nulls dropped, scalars coerced, bad values left for typesense to reject."""
+
+    def setUp(self):
+        self.project = func_schema.compile_projector({'fields': [
+            {'name': 'id', 'type': 'string'}, {'name': 'COUNT', 'type': 'int32'}, {'name': 'AMOUNT', 'type': 'float'},
+            {'name': 'NOTE', 'type': 'string'}, {'name': 'TAGS', 'type': 'string[]'}
+        ]})
+
+    def test_schema_fields_only_and_nulls_dropped(self):
+        self.assertEqual(self.project({'id': '1', 'COUNT': None, 'EXTRA': 'x', 'TAGS': ['a']}), {'id': '1', 'TAGS': ['a']})
+
+    def test_int_coercion(self):
+        for value, expected in ((3, 3), ('3', 3), (3.0, 3), (3.5, 3.5), ('3.5', '3.5'), ('x', 'x'), (True, True), ([3], [3])):
+            with self.subTest(value=value):
+                # never truncated: a fractional value reaches typesense as is and is rejected there
+                projected = self.project({'COUNT': value})['COUNT']
+                self.assertEqual((projected, type(projected)), (expected, type(expected)))
+
+    def test_float_coercion(self):
+        for value, expected in ((1.5, 1.5), (2, 2.0), ('2.25', 2.25), ('x', 'x')):
+            with self.subTest(value=value):
+                self.assertEqual(self.project({'AMOUNT': value})['AMOUNT'], expected)
+
+    def test_str_coercion(self):
+        for value, expected in (('café', 'café'), (7, '7'), (1.5, '1.5'), (True, 'true'), ({'a': 1, 'b': 'é'}, '{"a":1,"b":"é"}'), ([1, None], '[1,null]')):
+            with self.subTest(value=value):
+                self.assertEqual(self.project({'NOTE': value})['NOTE'], expected)
+
+
+class AvroDecimalTests(SimpleTestCase):
+    """The batched decoder gives bit-identical floats to the per-value Decimal decode it replaced."""
+
+    def assertSameFloats(self, values, scale):
+        # columns of VECTOR_MIN_ROWS or more take the numpy path
+        self.assertGreaterEqual(len(values), func_convert.VECTOR_MIN_ROWS)
+        expected = [float(func_convert.avro_decimal_from_base64(value, scale)).hex() for value in values]
+        self.assertEqual([value.hex() for value in func_convert.avro_decimals_to_float(values, scale)], expected)
+
+    def test_random_values(self):
+        rng = random.Random(7)
+        for scale in (0, 2, 4, 9, 18):
+            with self.subTest(scale=scale):
+                # 1 to 9 bytes: vector path up to 6, per-value fallback above
+                values = [encode_amount(rng.randrange(-2 ** (8 * size - 1), 2 ** (8 * size - 1))) for size in range(1, 10) for _ in range(50)]
+                self.assertSameFloats(values, scale)
+
+    def test_edge_values(self):
+        edges = [0, 1, -1, 5, -5, 99, 100, -100, 127, 128, -128, -129, 255, 256, 32767, -32768, 32768,
+                 2 ** 47 - 1, -2 ** 47, 2 ** 47, -2 ** 47 - 1, 10 ** 14 - 1, -(10 ** 14) + 1]
+        values = [encode_amount(value) for value in edges]
+        # redundant sign bytes, as some producers write fixed-width decimals
+        values += [encode_amount(value, 6) for value in (0, 1, -1, 127, -128, 2 ** 40)]
+        values += [encode_amount(value, 8) for value in (0, -1, 10 ** 12)]
+        # minimal width with the sign bit set: first byte exactly 0x80
+        values += [encode_amount(-2 ** (8 * size - 1), size) for size in range(1, 7)]
+        # past 12 base64 chars the whole column is decoded per value
+        long_values = [encode_amount(value) for value in (10 ** 28 - 1, 10 ** 28, -(10 ** 28), 10 ** 38 - 1, -(10 ** 38) + 1)]
+        for scale in (0, 2, 6, 10):
+            with self.subTest(scale=scale):
+                self.assertSameFloats(values * 3, scale)
+                self.assertSameFloats((long_values + values) * 3, scale)
+
+    def test_small_columns_per_value(self):
+        values = [encode_amount(value) for value in (-12345, 0, 99999)]
+        self.assertEqual(func_convert.avro_decimals_to_float(values, 2), [-123.45, 0.0, 999.99])
+
+
+class PeriodKeyTableTests(SimpleTestCase):
+    """Table lookups match datetime around every period boundary, DST zones included."""
+
+    def expected_key(self, timestamp_ms, granularity, tz):
+        local = datetime.fromtimestamp(timestamp_ms / 1000, tz=tz)
+        if granularity == 'month':
+            return f'{local.year:04d}{local.month:02d}'
+        if granularity == 'day':
+            return f'{local.year:04d}{local.month:02d}{local.day:02d}'
+        return f'{local.year:04d}{local.month:02d}_W{(local.day - 1) // 7 + 1}'
+
+    def test_boundaries_match_datetime(self):
+        for timezone in ('Asia/Kuala_Lumpur', 'Europe/London', 'America/New_York', 'UTC'):
+            tz = ZoneInfo(timezone)
+            for granularity in func_shard.GRANULARITIES:
+                with self.subTest(timezone=timezone, granularity=granularity):
+                    table = func_shard.PeriodKeyTable(granularity, timezone, start_year=2022, end_year=2025)
+                    timestamps = []
+                    day = datetime(2023, 1, 1, tzinfo=tz)
+                    while day.year < 2025:
+                        midnight = int(day.timestamp() * 1000)
+                        timestamps += [midnight - 1, midnight, midnight + 1, midnight + 12 * 3600 * 1000]
+                        day = datetime.combine(day.date() + timedelta(days=1), day.time(), tzinfo=tz)
+                    # forwards (cached range hits) and backwards
+                    for timestamp_ms in timestamps + timestamps[::-1]:
+                        self.assertEqual(table.key(timestamp_ms), self.expected_key(timestamp_ms, granularity, tz), timestamp_ms)
+
+    def test_outside_table_falls_back_to_datetime(self):
+        table = func_shard.PeriodKeyTable('month', 'Asia/Kuala_Lumpur', start_year=2022, end_year=2025)
+        tz = ZoneInfo('Asia/Kuala_Lumpur')
+        for timestamp_ms in (0, int(datetime(2021, 12, 31, 23, 59, tzinfo=tz).timestamp() * 1000), int(datetime(2026, 1, 1, tzinfo=tz).timestamp() * 1000), 4102444800000):
+            self.assertEqual(table.key(timestamp_ms), self.expected_key(timestamp_ms, 'month', tz))
+
+
+def transaction(tranid, update_date, status, create_date=NOVEMBER_MS):
+    return {'TRANID': tranid, 'CREATE_DATE': create_date, 'UPDATE_DATE': update_date, 'STATUS': status}
+
+class IterChunksDedupTests(SimpleTestCase):
+    """Duplicates of a batch collapse to the newest UPDATE_DATE, ties and missing versions to the later one."""
+
+    def statuses(self, chunks):
+        return [[(document['TRANID'], document['STATUS']) for documents in chunk.values() for document in documents] for chunk in chunks]
+
+    def test_newest_version_wins(self):
+        documents = [transaction(1, 1, 'a'), transaction(1, 3, 'c'), transaction(2, 1, 'x'), transaction(1, 2, 'b')]
+        chunks, stats = chunk_documents(transaction_pipeline(), documents)
+        self.assertEqual(self.statuses(chunks), [[(1, 'c'), (2, 'x')]])
+        self.assertEqual((stats['parsed'], stats['collapsed']), (4, 2))
+
+    def test_equal_or_missing_versions_keep_the_later(self):
+        for first, second in ((5, 5), (None, 5), (5, None), (None, None)):
+            with self.subTest(versions=(first, second)):
+                chunks, stats = chunk_documents(transaction_pipeline(), [transaction(1, first, 'first'), transaction(1, second, 'second')])
+                self.assertEqual(self.statuses(chunks), [[(1, 'second')]])
+                self.assertEqual(stats['collapsed'], 1)
+
+    def test_older_version_after_flushed_chunk_dropped(self):
+        # the newer version already went out with the first chunk
+        documents = [transaction(1, 5, 'new'), transaction(2, 1, 'x'), transaction(1, 3, 'old'), transaction(3, 1, 'y')]
+        with mock.patch.object(pipeline, 'STREAM_CHUNK_DOCS', 2):
+            chunks, stats = chunk_documents(transaction_pipeline(), documents)
+        self.assertEqual(self.statuses(chunks), [[(1, 'new'), (2, 'x')], [(3, 'y')]])
+        self.assertEqual(stats['collapsed'], 1)
+
+    def test_newer_version_after_flushed_chunk_sent_again(self):
+        # not a collapse: both versions are imported, in order
+        documents = [transaction(1, 3, 'old'), transaction(2, 1, 'x'), transaction(1, 5, 'new')]
+        with mock.patch.object(pipeline, 'STREAM_CHUNK_DOCS', 2):
+            chunks, stats = chunk_documents(transaction_pipeline(), documents)
+        self.assertEqual(self.statuses(chunks), [[(1, 'old'), (2, 'x')], [(1, 'new')]])
+        self.assertEqual(stats['collapsed'], 0)
+
+    def test_collapsed_across_shards(self):
+        # a later version may move the document to another month
+        documents = [transaction(1, 1, 'a', NOVEMBER_MS), transaction(1, 2, 'b', DECEMBER_MS)]
+        chunks, stats = chunk_documents(transaction_pipeline(), documents)
+        self.assertEqual(chunks, [{'202312': [{'id': '1', 'TRANID': 1, 'STATUS': 'b', 'CREATE_DATE': DECEMBER_MS}]}])
+        self.assertEqual(stats['collapsed'], 1)
+
+
+class AdaptiveChunkSizerTests(SimpleTestCase):
+    """Chunk size follows throughput * target, halves on failure and stays within its bounds."""
+
+    def setUp(self):
+        self.sizer = AdaptiveChunkSizer(min_docs=100, max_docs=5000, initial_docs=1000, target_seconds=2)
+
+    def test_grows_with_fast_imports(self):
+        # 1000 docs in 0.5s: 4000 docs fit the 2s target
+        sizes = []
+        for _ in range(20):
+            self.sizer.observe('c', 1000, 0.5)
+            sizes.append(self.sizer.chunk_docs('c'))
+        self.assertEqual(sizes, sorted(sizes))
+        self.assertGreater(sizes[0], 1000)
+        self.assertAlmostEqual(sizes[-1], 4000, delta=5)
+
+    def test_shrinks_with_slow_or_failed_imports(self):
+        self.sizer.observe('c', 1000, 10)
+        self.assertEqual(self.sizer.chunk_docs('c'), 760)
+        self.sizer.observe('c', 760, 1, failed=True)
+        self.assertEqual(self.sizer.chunk_docs('c'), 380)
+
+    def test_bounds(self):
+        for _ in range(50):
+            self.sizer.observe('fast', 1000, 0.01)
+            self.sizer.observe('failing', 1000, 30, failed=True)
+        self.assertEqual(self.sizer.chunk_docs('fast'), 5000)
+        self.assertEqual(self.sizer.chunk_docs('failing'), 100)
+        self.assertEqual(self.sizer.chunk_docs('unseen'), 1000)
+
+    def test_split(self):
+        self.sizer.sizes['c'] = 400
+        self.assertEqual([len(chunk) for chunk in self.sizer.split('c', list(range(1000)))], [400, 400, 200])
+        self.assertEqual(self.sizer.split('c', [1, 2]), [[1, 2]])
+
+
+class ChunkBufferTests(SimpleTestCase):
+    """Collections accumulate across stream chunks up to the sizer's chunk size."""
+
+    def setUp(self):
+        self.sizer = AdaptiveChunkSizer(min_docs=100, max_docs=5000, initial_docs=1000, target_seconds=2)
+        self.buffer = ChunkBuffer(self.sizer)
+
+    def stream_chunk(self, documents_by_key):
+        return {'YYYYMM': {'prefix': 'transaction_month__', 'data': documents_by_key}}
+
+    def documents(self, start, count, version=0):
+        return [{'id': str(index), 'UPDATE_DATE': version} for index in range(start, start + count)]
+
+    def emitted(self, items):
+        return [(collection_name, [len(chunk) for chunk in chunks]) for collection_name, chunks in items]
+
+    def test_accumulates_across_stream_chunks(self):
+        emitted = []
+        for start in (0, 700, 1400):
+            emitted += self.emitted(self.buffer.add(self.stream_chunk({'202311': self.documents(start, 700), '202312': self.documents(start, 10)})))
+        self.assertEqual(emitted, [('transaction_month__202311', [1000]), ('transaction_month__202311', [1000])])
+        self.assertEqual(self.emitted(self.buffer.flush()), [('transaction_month__202311', [100]), ('transaction_month__202312', [30])])
+        self.assertEqual(self.emitted(self.buffer.flush()), [])
+
+    def test_grown_size_reaches_import(self):
+        # stream chunks stay at 1000 docs, imports follow the grown size
+        self.sizer.sizes['transaction_month__202311'] = 4000
+        emitted = []
+        for start in range(0, 9000, 1000):
+            emitted += self.emitted(self.buffer.add(self.stream_chunk({'202311': self.documents(start, 1000)})))
+        self.assertEqual(emitted, [('transaction_month__202311', [4000]), ('transaction_month__202311', [4000])])
+        self.assertEqual(self.emitted(self.buffer.flush()), [('transaction_month__202311', [1000])])
+
+    def test_newer_version_replaces_buffered_document(self):
+        list(self.buffer.add(self.stream_chunk({'202311': self.documents(0, 3)})))
+        list(self.buffer.add(self.stream_chunk({'202311': self.documents(1, 1, version=5)})))
+        [(collection_name, [chunk])] = list(self.buffer.flush())
+        self.assertEqual([(document['id'], document['UPDATE_DATE']) for document in chunk], [('0', 0), ('2', 0), ('1', 5)])
+
+
+class BuildResultTests(SimpleTestCase):
+    """Whole-import failures belong to the connector (503), per-document ones to the retry queue."""
+
+    def setUp(self):
+        self.retry_queue = mock.Mock()
+        self.retry_queue.add.return_value = (1, 0)
+        patcher = mock.patch.object(importer, 'retry_queue', self.retry_queue)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.documents = [{'id': '1'}, {'id': '2'}]
+
+    def test_whole_import_failure_not_queued(self):
+        result = importer.build_result('c', self.documents, None, Exception('Typesense import failed [503]: Not Ready or Lagging'), 0)
+        self.assertTrue(result['failed'])
+        self.assertEqual((result['processed'], result['retrying'], result['dead_lettered']), (0, 0, 0))
+        self.retry_queue.add.assert_not_called()
+
+    def test_document_failure_queued(self):
+        response = [{'success': True}, {'success': False, 'error': 'Not Ready or Lagging'}]
+        result = importer.build_result('c', self.documents, response, None, 0)
+        self.assertFalse(result['failed'])
+        self.assertEqual((result['processed'], result['retrying']), (1, 1))
+        self.retry_queue.add.assert_called_once_with('c', [({'id': '2'}, 'Not Ready or Lagging')])
+        self.retry_queue.discard.assert_called_once_with('c', ['1'])
+
+
+def month_collection(offset):
+    # transaction month collection `offset` months from now (shard timezone)
+    today = datetime.now(ZoneInfo(collection_cache.SHARD_TIMEZONE)).date()
+    index = today.year * 12 + today.month - 1 + offset
+    return f'transaction_month__{index // 12}{index % 12 + 1:02d}'
+
+
+class CollectionRetentionTests(SimpleTestCase):
+    """Only months the cron keeps (last, current, next) are auto-created."""
+
+    def setUp(self):
+        self.client = mock.MagicMock()
+        self.existing = set()
+
+        def retrieve(name):
+            if name not in self.existing:
+                raise ObjectNotFound(f'No collection with name `{name}` found.')
+            return {'name': name}
+        self.client.collections.__getitem__.side_effect = lambda name: mock.Mock(retrieve=lambda: retrieve(name))
+        self.cache = collection_cache.CollectionCache(self.client)
+
+    def test_window(self):
+        today = date(2024, 1, 15)
+        for name, expected in [
+            ('transaction_month__202312', True), ('transaction_month__202402', True), ('transaction_month__202401_W3', True),
+            ('status_count_mins_month__20240131', True), ('transaction_month__202311', False), ('transaction_month__202403', False),
+            ('transaction_month__197001', False), ('transaction', True)
+        ]:
+            with self.subTest(name=name):
+                self.assertEqual(collection_cache.in_retention(name, today), expected)
+
+    def test_missing_month_inside_window_created(self):
+        for offset in (-1, 0, 1):
+            self.cache.ensure(month_collection(offset))
+        self.assertEqual([call.args[0]['name'] for call in self.client.collections.create.call_args_list], [month_collection(offset) for offset in (-1, 0, 1)])
+
+    def test_missing_month_outside_window_not_created(self):
+        for offset in (-2, 2, -600):
+            with self.subTest(offset=offset):
+                with self.assertRaises(collection_cache.CollectionOutsideRetention):
+                    self.cache.ensure(month_collection(offset))
+                # remembered, no round trip for the next late document
+                self.client.collections.__getitem__.reset_mock()
+                with self.assertRaises(collection_cache.CollectionOutsideRetention):
+                    self.cache.ensure(month_collection(offset))
+                self.client.collections.__getitem__.assert_not_called()
+        self.client.collections.create.assert_not_called()
+
+    def test_existing_month_outside_window_still_written(self):
+        # not dropped by the cron yet
+        self.existing.add(month_collection(-2))
+        self.cache.ensure(month_collection(-2))
+        self.assertTrue(self.cache.is_known(month_collection(-2)))
+        self.client.collections.create.assert_not_called()
+
+    def test_outside_window_documents_dead_lettered_not_failed(self):
+        retry_queue = mock.Mock()
+        retry_queue.add.return_value = (0, 2)
+        with mock.patch.object(importer, 'retry_queue', retry_queue):
+            error = collection_cache.CollectionOutsideRetention('outside the auto-create months')
+            result = importer.build_result('transaction_month__197001', [{'id': '1'}, {'id': '2'}], None, error, 0)
+        self.assertFalse(result['failed'])
+        self.assertEqual(result['dead_lettered'], 2)
+        # dead-lettered at once, not retried
+        self.assertEqual(classify_error(str(self.cache.outside_error('transaction_month__197001'))), 'permanent')
+
+
+def profiler_threads():
+    return [thread for thread in threading.enumerate() if thread.name == 'typesense_profiler']
+
+class ProfilerStateTests(SimpleTestCase):
+    def setUp(self):
+        self.state = profiling.ProfilerState()
+        # a file where the directory should be: makedirs raises
+        handle, self.blocked_dir = tempfile.mkstemp()
+        os.close(handle)
+        self.addCleanup(os.unlink, self.blocked_dir)
+
+    def test_window_unwritable_dir_leaves_nothing_running(self):
+        with mock.patch.object(profiling, 'PROFILE_DIR', self.blocked_dir):
+            with self.assertRaises(OSError):
+                self.state.start_window(1)
+        self.assertFalse(self.state.busy)
+        self.assertEqual(profiler_threads(), [])
+
+    def test_request_unwritable_dir_skips_profile(self):
+        with mock.patch.multiple(profiling, PROFILE_DIR=self.blocked_dir, PROFILE_ENABLED=True, PROFILE_SAMPLE_RATE=1, PROFILE_MODE='sample'):
+            self.assertIsNone(self.state.start_request('transaction', os.getpid()))
+        self.assertFalse(self.state.busy)
+        self.assertEqual(profiler_threads(), [])
+
+    def test_request_profile_stops_sampler_when_write_fails(self):
+        with tempfile.TemporaryDirectory() as profile_dir:
+            with mock.patch.multiple(profiling, PROFILE_DIR=profile_dir, PROFILE_ENABLED=True, PROFILE_SAMPLE_RATE=1, PROFILE_MODE='sample'), \
+                    mock.patch.object(profiling, 'profiler_state', self.state):
+                profile = self.state.start_request('transaction', os.getpid())
+                self.assertTrue(self.state.busy)
+                with mock.patch.object(profile.profiler, 'write', side_effect=OSError('disk full')):
+                    profile.stop()
+        self.assertFalse(self.state.busy)
+        self.assertEqual(profiler_threads(), [])
+
+
+class AsyncPostRetryTests(SimpleTestCase):
+    """async_post retries like the sync typesense client: 500/503 and transport errors, num_retries times."""
+
+    def post(self, statuses, num_retries=3):
+        calls = []
+        def handler(request):
+            status = statuses[min(len(calls), len(statuses) - 1)]
+            calls.append(str(request.url))
+            if status is None:
+                raise httpx.ConnectError('connection refused', request=request)
+            return httpx.Response(status, json={'message': f'HTTP {status}'} if status >= 300 else [])
+
+        async def post():
+            async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+                with mock.patch.object(func_client, 'get_async_client', return_value=client), \
+                        mock.patch.object(func_client, 'node_url', return_value='http://typesense:8108'), \
+                        mock.patch.object(func_client, 'eject_node') as eject_node, \
+                        mock.patch.dict(os.environ, {'TYPESENSE_NUM_RETRIES': str(num_retries)}):
+                    try:
+                        return await func_client.async_post('/collections/c/documents/import', b'{}'), calls, eject_node
+                    except Exception as e:
+                        return e, calls, eject_node
+        return asyncio.run(post())
+
+    def test_server_errors_retried_until_success(self):
+        response, calls, eject_node = self.post([503, None, 500, 200])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(calls), 4)
+        self.assertEqual(eject_node.call_count, 3)
+
+    def test_gives_up_after_num_retries(self):
+        error, calls, eject_node = self.post([503], num_retries=2)
+        self.assertIsInstance(error, ServiceUnavailable)
+        self.assertEqual(len(calls), 3)
+        self.assertEqual(eject_node.call_count, 3)
+
+    def test_client_errors_not_retried(self):
+        error, calls, eject_node = self.post([404])
+        self.assertIsInstance(error, ObjectNotFound)
+        self.assertEqual(len(calls), 1)
+        eject_node.assert_not_called()
+
+
+class RequestBytesTests(SimpleTestCase):
+    """REQUEST_BYTES counts the body bytes read, not the declared Content-Length."""
+
+    def ingest(self, body, content_length):
+        django_request = RequestFactory().post('/typesense/transaction', data=body, content_type='application/json')
+        django_request.META['CONTENT_LENGTH'] = str(content_length)
+        request = Request(django_request)
+        with mock.patch.object(pipeline, 'ASYNC_ENDPOINTS', {'transaction'}), \
+                mock.patch.object(pipeline, 'start_spool'), \
+                mock.patch.object(pipeline.spool_writer, 'append', return_value=('segment', 0)), \
+                mock.patch.object(metrics.REQUEST_BYTES, 'inc') as request_bytes:
+            response = pipeline.ingest('transaction', request)
+        return response, request_bytes
+
+    def test_spooled_body_counts_bytes_read(self):
+        body = b'[{"TRANID": 1, "CREATE_DATE": 1700000000000}]'
+        response, request_bytes = self.ingest(body, len(body))
+        self.assertEqual(response.status_code, 202)
+        request_bytes.assert_called_once_with(len(body), endpoint='transaction')
+
+    def test_rejected_body_counts_nothing(self):
+        # declared over the limit: refused before reading
+        response, request_bytes = self.ingest(b'[]', pipeline.MAX_BODY_BYTES + 1)
+        self.assertEqual(response.status_code, 413)
+        request_bytes.assert_called_once_with(0, endpoint='transaction')
+
+
+class ClusterFailoverTests(SimpleTestCase):
+    """Leader routing, ejection and readmission against a three-node fake cluster."""
+
+    EJECT_SECONDS = 0.2
+
+    def setUp(self):
+        self.cluster = FakeCluster(3, leader=0).start()
+        self.addCleanup(self.cluster.stop)
+        self.monitor = func_cluster.ClusterMonitor(self.cluster.urls, None, 'k', interval_seconds=3600, eject_seconds=self.EJECT_SECONDS, read_strategy='round_robin')
+        # checks are driven by the test, not the background loop
+        mock.patch.object(self.monitor, 'start').start()
+        self.addCleanup(mock.patch.stopall)
+        self.check()
+        self.client = func_cluster.use_cluster_routing(typesense.Client({'nodes': self.cluster.urls, 'api_key': 'k', 'connection_timeout_seconds': 2, 'num_retries': 3}), self.monitor, 'write')
+
+    def check(self):
+        for url in self.cluster.urls:
+            self.monitor.check(url)
+
+    def writes(self):
+        # collection creates per node
+        return [node.requests.get('/collections', 0) for node in self.cluster.nodes]
+
+    def create(self, name):
+        self.client.collections.create({'name': name, 'fields': [{'name': 'id', 'type': 'string'}]})
+
+    def test_writes_go_to_leader(self):
+        self.create('a')
+        self.create('b')
+        self.assertEqual(self.writes(), [2, 0, 0])
+        self.cluster.set_leader(2)
+        self.check()
+        self.create('c')
+        self.assertEqual(self.writes(), [2, 0, 1])
+
+    def test_failed_node_ejected_then_readmitted(self):
+        # leader goes down and node 1 takes over
+        self.cluster.nodes[0].down = True
+        self.cluster.set_leader(1)
+        self.check()
+        self.assertFalse(self.monitor.status()[self.cluster.urls[0]]['healthy'])
+        self.create('a')
+        self.assertEqual(self.writes(), [0, 1, 0])
+
+        # back up: still out until the ejection runs out, then the next passing check readmits it
+        self.cluster.nodes[0].down = False
+        self.cluster.set_leader(0)
+        self.check()
+        self.assertFalse(self.monitor.status()[self.cluster.urls[0]]['healthy'])
+        time.sleep(self.EJECT_SECONDS)
+        self.check()
+        self.assertTrue(self.monitor.status()[self.cluster.urls[0]]['healthy'])
+        self.create('b')
+        self.assertEqual(self.writes(), [1, 1, 0])
+
+    def test_failed_request_ejects_node_and_retries_elsewhere(self):
+        # down between two checks: the request itself finds out
+        self.cluster.nodes[0].down = True
+        self.create('a')
+        self.assertEqual(self.cluster.nodes[0].requests['/collections'], 1)
+        self.assertFalse(self.monitor.status()[self.cluster.urls[0]]['healthy'])
+        self.assertIn('a', self.cluster.collections)
+
+    def test_async_import_follows_leader(self):
+        self.create('a')
+        self.cluster.nodes[0].down = True
+        self.cluster.set_leader(1)
+
+        async def post():
+            async with httpx.AsyncClient() as client:
+                with mock.patch.object(func_client, 'get_async_client', return_value=client), \
+                        mock.patch.object(func_client, 'get_cluster_monitor', return_value=self.monitor):
+                    return await func_client.async_post('/collections/a/documents/import', b'{"id": "1"}', params={'action': 'upsert'})
+
+        def imports(index):
+            return self.cluster.nodes[index].requests.get('/collections/a/documents/import', 0)
+
+        # no check in between: the 503 ejects the old leader and the retry lands on another node
+        self.assertEqual(asyncio.run(post()).status_code, 200)
+        self.assertEqual(imports(0), 1)
+        self.assertFalse(self.monitor.status()[self.cluster.urls[0]]['healthy'])
+        self.assertEqual(self.cluster.documents['a'], {'1': {'id': '1'}})
+
+        # the next check finds the new leader
+        self.check()
+        sent = imports(1)
+        self.assertEqual(asyncio.run(post()).status_code, 200)
+        self.assertEqual(imports(1), sent + 1)
+        self.assertEqual(imports(0), 1)
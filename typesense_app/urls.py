@@ -4,5 +4,9 @@ from . import views
 urlpatterns=[
     path('status_count_mins',views.status_count_mins),
     path('transaction',views.transaction),
-    path('health',views.healthcheck)
+    path('status_count_mins_async',views.status_count_mins_async),
+    path('transaction_async',views.transaction_async),
+    path('health',views.healthcheck),
+    path('metrics',views.metrics_view),
+    path('profile',views.profile)
 ]
\ No newline at end of file
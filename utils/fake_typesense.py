@@ -0,0 +1,191 @@
+import json
+import gzip
+import time
+import random
+import argparse
+import threading
+from urllib.parse import urlsplit
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeCluster:
+    """In-process multi-node Typesense stand-in for local runs: health, leader, collections and import.
+
+    Nodes share one store, as replicated nodes would. A node can be taken down (503 on every request)
+    or made leader, and per-node request counts show where the client routed its calls. Imports can be
+    slowed (`latency` + up to `jitter` seconds), fail whole (`import_failure_rate`, 503) or reject single
+    documents as transient errors (`error_rate`); `keep_documents=False` only counts them (benchmarks).
+    """
+
+    def __init__(self, nodes=3, leader=0, host='127.0.0.1', ports=None, latency=0.0, jitter=0.0, error_rate=0.0, import_failure_rate=0.0, keep_documents=True):
+        self.lock = threading.Lock()
+        self.collections = {}
+        self.documents = {}
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.import_failure_rate = import_failure_rate
+        self.keep_documents = keep_documents
+        self.imported = 0
+        self.rejected = 0
+        self.nodes = [FakeNode(self, index, host, ports[index] if ports else 0) for index in range(nodes)]
+        self.set_leader(leader)
+
+    @property
+    def urls(self):
+        return [node.url for node in self.nodes]
+
+    def set_leader(self, index):
+        for node in self.nodes:
+            node.leader = node.index == index
+
+    def start(self):
+        for node in self.nodes:
+            node.start()
+        return self
+
+    def stop(self):
+        for node in self.nodes:
+            node.server.shutdown()
+            node.server.server_close()
+
+
+class FakeServer(ThreadingHTTPServer):
+    # listen backlog of 5 resets connections under load test concurrency
+    request_queue_size = 256
+
+
+class FakeNode:
+    def __init__(self, cluster, index, host, port):
+        self.cluster = cluster
+        self.index = index
+        self.leader = False
+        self.down = False
+        self.requests = {}
+        self.server = FakeServer((host, port), self.handler())
+        self.url = f'http://{host}:{self.server.server_address[1]}'
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, name=f'fake_typesense_{self.index}', daemon=True).start()
+
+    def count(self, path):
+        with self.cluster.lock:
+            self.requests[path] = self.requests.get(path, 0) + 1
+
+    def handler(self):
+        node = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def send(self, status, body, content_type='application/json'):
+                content = (body if isinstance(body, str) else json.dumps(body)).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            def read_body(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+                return gzip.decompress(body) if self.headers.get('Content-Encoding') == 'gzip' else body
+
+            def route(self, method):
+                path = urlsplit(self.path).path.rstrip('/')
+                body = self.read_body() if method in ('POST', 'PATCH') else b''
+                node.count(path)
+                if node.down:
+                    return self.send(503, {'message': 'Not Ready or Lagging'})
+                if path == '/health':
+                    return self.send(200, {'ok': True})
+                if path == '/debug':
+                    # Raft state 1 is the leader, 4 a follower
+                    return self.send(200, {'state': 1 if node.leader else 4, 'version': 'fake'})
+                return self.collections(method, path.split('/')[1:], body)
+
+            def collections(self, method, parts, body):
+                cluster = node.cluster
+                if parts == ['collections'] and method == 'GET':
+                    return self.send(200, list(cluster.collections.values()))
+                if parts == ['collections'] and method == 'POST':
+                    schema = json.loads(body)
+                    with cluster.lock:
+                        if schema['name'] in cluster.collections:
+                            return self.send(409, {'message': f"A collection with name `{schema['name']}` already exists."})
+                        cluster.collections[schema['name']] = schema
+                        cluster.documents[schema['name']] = {}
+                    return self.send(201, schema)
+                if len(parts) < 2 or parts[0] != 'collections' or parts[1] not in cluster.collections:
+                    return self.send(404, {'message': 'Not Found'})
+
+                name = parts[1]
+                if len(parts) == 2 and method == 'GET':
+                    return self.send(200, dict(cluster.collections[name], num_documents=len(cluster.documents[name])))
+                if len(parts) == 2 and method == 'DELETE':
+                    with cluster.lock:
+                        cluster.documents.pop(name)
+                        return self.send(200, cluster.collections.pop(name))
+                if parts[2:] == ['documents', 'import'] and method == 'POST':
+                    return self.import_documents(cluster, name, body)
+                return self.send(404, {'message': 'Not Found'})
+
+            def import_documents(self, cluster, name, body):
+                if cluster.latency or cluster.jitter:
+                    time.sleep(cluster.latency + random.uniform(0, cluster.jitter))
+                if cluster.import_failure_rate and random.random() < cluster.import_failure_rate:
+                    return self.send(503, {'message': 'Not Ready or Lagging'})
+
+                responses = []
+                documents = {}
+                rejected = 0
+                for line in body.decode().split('\n'):
+                    if not line.strip():
+                        continue
+                    if cluster.error_rate and random.random() < cluster.error_rate:
+                        responses.append(json.dumps({'success': False, 'error': 'Not Ready or Lagging', 'document': line}))
+                        rejected += 1
+                        continue
+                    if cluster.keep_documents:
+                        document = json.loads(line)
+                        documents[str(document['id'])] = document
+                    responses.append('{"success":true}')
+                with cluster.lock:
+                    cluster.documents.setdefault(name, {}).update(documents)
+                    cluster.imported += len(responses) - rejected
+                    cluster.rejected += rejected
+                return self.send(200, '\n'.join(responses), 'text/plain')
+
+            def do_GET(self):
+                self.route('GET')
+
+            def do_POST(self):
+                self.route('POST')
+
+            def do_PATCH(self):
+                self.route('PATCH')
+
+            def do_DELETE(self):
+                self.route('DELETE')
+
+        return Handler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Run a fake multi-node Typesense cluster (TYPESENSE_NODES stand-in).')
+    parser.add_argument('--nodes', type=int, default=3, help='Number of nodes.')
+    parser.add_argument('--port', type=int, default=8108, help='Port of the first node, the others follow.')
+    parser.add_argument('--host', type=str, default='127.0.0.1', help='Bind address.')
+    parser.add_argument('--leader', type=int, default=0, help='Index of the leader node.')
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds added to every import.')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Up to this many extra seconds per import (uniform).')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of documents rejected with a transient error.')
+    parser.add_argument('--import-failure-rate', type=float, default=0.0, help='Fraction of imports failing whole with 503.')
+    args = parser.parse_args()
+
+    cluster = FakeCluster(
+        args.nodes, args.leader, args.host, ports=[args.port + index for index in range(args.nodes)],
+        latency=args.latency, jitter=args.jitter, error_rate=args.error_rate, import_failure_rate=args.import_failure_rate
+    ).start()
+    print(f"TYPESENSE_NODES={','.join(cluster.urls)}")
+    threading.Event().wait()
@@ -0,0 +1,18 @@
+import time
+import base64
+
+
+def encode_amount(cents, length=None):
+    """Avro decimal as Kafka Connect writes it: big-endian two's complement, base64 (`length` bytes if given)."""
+    length = length or max(1, (cents.bit_length() + 8) // 8)
+    return base64.b64encode(cents.to_bytes(length, byteorder='big', signed=True)).decode()
+
+def bench(label, func, repeat):
+    # best of `repeat` runs, with the last result for an equality check
+    best = None
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start_time
+        best = elapsed if best is None else min(best, elapsed)
+    return label, best, result
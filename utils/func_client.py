@@ -0,0 +1,255 @@
+import os
+import gzip
+import socket
+import httpx
+import asyncio
+import contextlib
+import contextvars
+import requests
+import typesense
+from typesense import api_call, exceptions
+from requests.adapters import HTTPAdapter
+
+from utils import func_cluster
+
+
+def env_bool(name, default=False):
+    value = os.environ.get(name)
+    if value is None or value == '':
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+def env_int(name, default):
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+def env_float(name, default):
+    value = os.environ.get(name)
+    return float(value) if value else default
+
+
+class TypesenseTransportAdapter(HTTPAdapter):
+    """Pooled keep-alive adapter with optional gzip of large request bodies."""
+
+    def __init__(self, pool_connections, pool_maxsize, keepalive_idle, gzip_enabled, gzip_min_bytes):
+        self.keepalive_idle = keepalive_idle
+        self.gzip_enabled = gzip_enabled
+        self.gzip_min_bytes = gzip_min_bytes
+        super().__init__(pool_connections=pool_connections, pool_maxsize=pool_maxsize, pool_block=True)
+
+    def init_poolmanager(self, *args, **kwargs):
+        # tcp keep-alive on every pooled socket
+        socket_options = [(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1), (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)]
+        if hasattr(socket, 'TCP_KEEPIDLE'):
+            socket_options.append((socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, self.keepalive_idle))
+        if hasattr(socket, 'TCP_KEEPINTVL'):
+            socket_options.append((socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, self.keepalive_idle))
+        kwargs['socket_options'] = socket_options
+        super().init_poolmanager(*args, **kwargs)
+
+    def send(self, request, **kwargs):
+        # gzip large bodies (imports), leave small requests untouched
+        body = request.body
+        if self.gzip_enabled and body and 'Content-Encoding' not in request.headers:
+            if isinstance(body, str):
+                body = body.encode('utf-8')
+            if isinstance(body, bytes) and len(body) >= self.gzip_min_bytes:
+                request.body = gzip.compress(body, compresslevel=1)
+                request.headers['Content-Encoding'] = 'gzip'
+                request.headers['Content-Length'] = str(len(request.body))
+        return super().send(request, **kwargs)
+
+
+transport_adapter = None
+
+def configure_transport():
+    """Mount the pooled adapter on the session shared by every typesense.Client."""
+    global transport_adapter
+    if transport_adapter is not None:
+        return transport_adapter
+
+    transport_adapter = TypesenseTransportAdapter(
+        pool_connections=env_int('TYPESENSE_POOL_HOSTS', 4),
+        pool_maxsize=env_int('TYPESENSE_POOL_SIZE', 32),
+        keepalive_idle=env_int('TYPESENSE_KEEPALIVE_SECONDS', 60),
+        gzip_enabled=env_bool('TYPESENSE_GZIP', False),
+        gzip_min_bytes=env_int('TYPESENSE_GZIP_MIN_BYTES', 65536)
+    )
+    api_call.session.mount('http://', transport_adapter)
+    api_call.session.mount('https://', transport_adapter)
+    api_call.session.headers['Connection'] = 'keep-alive'
+    return transport_adapter
+
+def reset_transport():
+    # fresh session per forked worker, pooled sockets are not fork-safe
+    global transport_adapter
+    api_call.session = requests.Session()
+    transport_adapter = None
+    return configure_transport()
+
+cluster_monitor = None
+
+def get_cluster_monitor():
+    """Health/leader monitor shared by every client of the process, None for a single node."""
+    global cluster_monitor
+    urls = func_cluster.node_urls()
+    if len(urls) < 2 and not func_cluster.nearest_node_url():
+        return None
+    if cluster_monitor is None:
+        cluster_monitor = func_cluster.ClusterMonitor(
+            urls,
+            func_cluster.nearest_node_url(),
+            api_key=os.environ.get('TYPESENSE_API_KEY'),
+            interval_seconds=env_float('TYPESENSE_HEALTHCHECK_SECONDS', 5),
+            eject_seconds=env_float('TYPESENSE_EJECT_SECONDS', 30),
+            read_strategy=os.environ.get('TYPESENSE_READ_STRATEGY', 'round_robin')
+        )
+    return cluster_monitor
+
+def num_retries():
+    # retries after the first attempt, sync and async clients alike (typesense default 3)
+    return env_int('TYPESENSE_NUM_RETRIES', 3)
+
+def build_client(read_timeout=None, connect_timeout=None, api_key=None, role='write'):
+    """typesense.Client; on a cluster, writes go to the leader and reads are balanced (role='read')."""
+    configure_transport()
+    connect_timeout = connect_timeout if connect_timeout is not None else env_float('TYPESENSE_CONNECT_TIMEOUT', 5)
+    read_timeout = read_timeout if read_timeout is not None else env_float('TYPESENSE_READ_TIMEOUT', 300)
+
+    config = {
+        'nodes': func_cluster.node_urls(),
+        'api_key': api_key or os.environ.get('TYPESENSE_API_KEY'),
+        # requests accepts a (connect, read) tuple
+        'connection_timeout_seconds': (connect_timeout, read_timeout),
+        'num_retries': num_retries()
+    }
+    monitor = get_cluster_monitor()
+    if monitor is None:
+        return typesense.Client(config)
+
+    if func_cluster.nearest_node_url():
+        config['nearest_node'] = func_cluster.nearest_node_url()
+    return func_cluster.use_cluster_routing(typesense.Client(config), monitor, role)
+
+def node_url(role='write'):
+    monitor = get_cluster_monitor()
+    if monitor is None:
+        return func_cluster.node_urls()[0]
+    return monitor.select(monitor.urls, role)
+
+def eject_node(url, reason):
+    # a failed request takes the node out of rotation until its health check passes again
+    monitor = get_cluster_monitor()
+    if monitor is not None:
+        monitor.eject(url, reason)
+
+
+def prepare_body(body):
+    # same gzip policy as the sync adapter
+    content = body.encode('utf-8') if isinstance(body, str) else body
+    if env_bool('TYPESENSE_GZIP', False) and len(content) >= env_int('TYPESENSE_GZIP_MIN_BYTES', 65536):
+        return gzip.compress(content, compresslevel=1), {'Content-Encoding': 'gzip'}
+    return content, {}
+
+async_client = None
+async_client_loop = None
+
+# set by the ASGI entry point: one event loop per worker, so a pooled client outlives the request
+persistent_async_client = False
+
+# request-scoped client, see async_client_scope()
+request_async_client = contextvars.ContextVar('request_async_client', default=None)
+
+def use_persistent_async_client():
+    global persistent_async_client
+    persistent_async_client = True
+
+def new_async_client(read_timeout=None, connect_timeout=None):
+    connect_timeout = connect_timeout if connect_timeout is not None else env_float('TYPESENSE_CONNECT_TIMEOUT', 5)
+    read_timeout = read_timeout if read_timeout is not None else env_float('TYPESENSE_READ_TIMEOUT', 300)
+    return httpx.AsyncClient(
+        headers={'X-TYPESENSE-API-KEY': os.environ.get('TYPESENSE_API_KEY') or ''},
+        timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+        limits=httpx.Limits(max_connections=env_int('TYPESENSE_POOL_SIZE', 32), max_keepalive_connections=env_int('TYPESENSE_POOL_SIZE', 32), keepalive_expiry=env_int('TYPESENSE_KEEPALIVE_SECONDS', 60))
+    )
+
+@contextlib.asynccontextmanager
+async def async_client_scope():
+    """Scope of one async request. Under WSGI (runserver, gunicorn gthread) every async view runs in
+    a fresh event loop, so the client made for it is closed when the request ends."""
+    if persistent_async_client:
+        yield
+        return
+    scope = {'client': None}
+    token = request_async_client.set(scope)
+    try:
+        yield
+    finally:
+        request_async_client.reset(token)
+        if scope['client'] is not None:
+            await scope['client'].aclose()
+
+def get_async_client(read_timeout=None, connect_timeout=None):
+    """httpx.AsyncClient for the running request (request-scoped) or event loop (one per ASGI worker), requests take absolute node URLs."""
+    global async_client, async_client_loop
+    scope = request_async_client.get()
+    if scope is not None:
+        if scope['client'] is None:
+            scope['client'] = new_async_client(read_timeout, connect_timeout)
+        return scope['client']
+
+    loop = asyncio.get_running_loop()
+    if async_client is not None and async_client_loop is loop:
+        return async_client
+    if async_client is not None and not async_client_loop.is_closed():
+        # loop replaced while the old one still runs: close the old pool there
+        asyncio.run_coroutine_threadsafe(async_client.aclose(), async_client_loop)
+    async_client = new_async_client(read_timeout, connect_timeout)
+    async_client_loop = loop
+    return async_client
+
+
+# statuses the typesense client raises as ServerError/ServiceUnavailable and retries
+RETRY_STATUSES = (500, 503)
+
+STATUS_EXCEPTIONS = {
+    400: exceptions.RequestMalformed,
+    401: exceptions.RequestUnauthorized,
+    403: exceptions.RequestForbidden,
+    404: exceptions.ObjectNotFound,
+    409: exceptions.ObjectAlreadyExists,
+    422: exceptions.ObjectUnprocessable,
+    500: exceptions.ServerError,
+    503: exceptions.ServiceUnavailable
+}
+
+def raise_for_status(response):
+    """Raise what the typesense client raises for a non-2xx response."""
+    if 200 <= response.status_code < 300:
+        return
+    try:
+        message = response.json().get('message', 'API error.')
+    except ValueError:
+        message = 'API error.'
+    raise STATUS_EXCEPTIONS.get(response.status_code, exceptions.TypesenseClientError)(response.status_code, message)
+
+async def async_post(path, content, params=None, headers=None, role='write'):
+    """POST with the sync client's retry semantics: a connection error, timeout, 500 or 503 ejects the
+    node and the request is sent again (to the next node on a cluster), up to TYPESENSE_NUM_RETRIES times."""
+    client = get_async_client()
+    retries = num_retries()
+    for attempt in range(retries + 1):
+        url = node_url(role)
+        try:
+            response = await client.post(f'{url}{path}', params=params, content=content, headers=headers)
+        except httpx.TransportError as e:
+            eject_node(url, str(e) or type(e).__name__)
+            if attempt < retries:
+                continue
+            raise
+        if response.status_code in RETRY_STATUSES:
+            eject_node(url, f'HTTP {response.status_code}')
+            if attempt < retries:
+                continue
+        raise_for_status(response)
+        return response
@@ -0,0 +1,152 @@
+import os
+import time
+import logging
+import itertools
+import threading
+import requests
+from typesense.api_call import ApiCall
+from typesense.node_manager import NodeManager
+
+# logger
+logger = logging.getLogger(__name__)
+
+
+def env_list(name):
+    return [item.strip() for item in (os.environ.get(name) or '').split(',') if item.strip()]
+
+def node_urls():
+    """Cluster node URLs from TYPESENSE_NODES, or the single TYPESENSE_ENDPOINT node."""
+    urls = env_list('TYPESENSE_NODES')
+    if urls:
+        return [url.rstrip('/') for url in urls]
+    return [f"{os.environ.get('TYPESENSE_PROTOCOL', 'http')}://{os.environ.get('TYPESENSE_ENDPOINT')}:{os.environ.get('TYPESENSE_PORT')}"]
+
+def nearest_node_url():
+    url = os.environ.get('TYPESENSE_NEAREST_NODE')
+    return url.rstrip('/') if url else None
+
+
+class ClusterMonitor:
+    """Background /health and /debug checks of every node: latency, leader and temporary ejection.
+
+    A node failing a check (or a request, reported by the node manager) is ejected for `eject_seconds`
+    and readmitted by the first passing check after that. The Raft leader is the node whose /debug
+    reports state 1.
+    """
+
+    def __init__(self, urls, nearest_url, api_key, interval_seconds, eject_seconds, read_strategy):
+        self.urls = list(dict.fromkeys(urls + ([nearest_url] if nearest_url else [])))
+        self.nearest_url = nearest_url
+        self.api_key = api_key
+        self.interval_seconds = interval_seconds
+        self.eject_seconds = eject_seconds
+        self.read_strategy = read_strategy
+        self.states = {url: {'ejected_until': 0.0, 'latency': None, 'leader': False} for url in self.urls}
+        self.counter = itertools.count()
+        self.session = requests.Session()
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def start(self):
+        with self.lock:
+            # a forked worker inherits the object but not the thread
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self.loop, name='typesense_cluster_monitor', daemon=True)
+                self.thread.start()
+
+    def loop(self):
+        while True:
+            for url in self.urls:
+                self.check(url)
+            time.sleep(self.interval_seconds)
+
+    def check(self, url):
+        state = self.states[url]
+        start_time = time.time()
+        try:
+            response = self.session.get(f'{url}/health', timeout=2)
+            if response.status_code != 200 or not response.json().get('ok'):
+                raise Exception(f'/health returned {response.status_code}')
+            latency = time.time() - start_time
+            state['latency'] = latency if state['latency'] is None else 0.7 * state['latency'] + 0.3 * latency
+
+            debug = self.session.get(f'{url}/debug', headers={'X-TYPESENSE-API-KEY': self.api_key or ''}, timeout=2)
+            state['leader'] = debug.status_code == 200 and debug.json().get('state') == 1
+            if state['ejected_until'] and state['ejected_until'] <= time.monotonic():
+                state['ejected_until'] = 0.0
+                logger.info(f"Typesense node {url} healthy again, readmitted")
+        except Exception as e:
+            self.eject(url, str(e))
+
+    def eject(self, url, reason):
+        state = self.states.get(url)
+        if state is None:
+            return
+        if state['ejected_until'] <= time.monotonic():
+            logger.warning(f"Typesense node {url} ejected for {self.eject_seconds:.0f}sec: {reason}")
+        state['ejected_until'] = time.monotonic() + self.eject_seconds
+        state['leader'] = False
+
+    def available(self, urls):
+        now = time.monotonic()
+        healthy = [url for url in urls if self.states[url]['ejected_until'] <= now]
+        # every node ejected: keep trying them rather than failing outright
+        return healthy or list(urls)
+
+    def select(self, urls, role):
+        self.start()
+        candidates = self.available(urls)
+        if role == 'write':
+            # followers forward writes to the leader, going there directly saves a hop
+            for url in candidates:
+                if self.states[url]['leader']:
+                    return url
+        elif self.nearest_url in candidates:
+            return self.nearest_url
+        elif self.read_strategy == 'least_latency':
+            measured = [url for url in candidates if self.states[url]['latency'] is not None]
+            if measured:
+                return min(measured, key=lambda url: self.states[url]['latency'])
+        return candidates[next(self.counter) % len(candidates)]
+
+    def status(self):
+        now = time.monotonic()
+        return {url: {'healthy': state['ejected_until'] <= now, 'leader': state['leader'], 'latency': state['latency']} for url, state in self.states.items()}
+
+
+class ClusterNodeManager(NodeManager):
+    """typesense NodeManager that routes by role (read/write) through the shared ClusterMonitor."""
+
+    def __init__(self, config, monitor, role):
+        super().__init__(config)
+        self.monitor = monitor
+        self.role = role
+        nodes = self.nodes + ([config.nearest_node] if config.nearest_node else [])
+        self.nodes_by_url = {node.url().rstrip('/'): node for node in nodes}
+
+    def get_node(self):
+        return self.nodes_by_url[self.monitor.select(list(self.nodes_by_url), self.role)]
+
+    def set_node_health(self, node, is_healthy):
+        super().set_node_health(node, is_healthy)
+        if not is_healthy:
+            self.monitor.eject(node.url().rstrip('/'), 'request failed')
+
+
+class ClusterApiCall(ApiCall):
+    def __init__(self, config, monitor, role):
+        super().__init__(config)
+        self.node_manager = ClusterNodeManager(config, monitor, role)
+
+    def _make_request_and_process_response(self, fn, url, entity_type, as_json, **kwargs):
+        # health is owned by the monitor; the base class would call get_node() again here
+        return self.request_handler.make_request(fn=fn, url=url, as_json=as_json, entity_type=entity_type, **kwargs)
+
+def use_cluster_routing(client, monitor, role):
+    # point the client and every resource it already built at the role-aware api call
+    api_call = ClusterApiCall(client.config, monitor, role)
+    client.api_call = api_call
+    for resource in vars(client).values():
+        if hasattr(resource, 'api_call'):
+            resource.api_call = api_call
+    return client
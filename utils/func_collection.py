@@ -2,6 +2,8 @@ import time
 import typesense
 from typesense.exceptions import ObjectNotFound
 
+from utils import func_schema
+
 
 def log_process_time(logger, start_time, log_msg):
     process_time = time.time() - start_time
@@ -25,10 +27,42 @@ def check_and_create_collection(logger, process_id, client, collection_name, sch
     except Exception as e:
         raise
 
+def sync_collection(logger, process_id, client, collection_name, apply_updates=False):
+    # create from the schema registry, or report (and optionally fix) drift of an existing collection
+    expected_schema = func_schema.collection_schema(collection_name)
+    version = func_schema.schema_version(collection_name)
+    try:
+        start_time = time.time()
+        live_schema = client.collections[collection_name].retrieve()
+    except ObjectNotFound:
+        client.collections.create(expected_schema)
+        log_process_time(logger, start_time, f"[PID:{process_id}] Collection '{collection_name}' created from schema v{version}")
+        return None
+
+    diff = func_schema.diff_schema(expected_schema, live_schema)
+    if not func_schema.has_drift(diff):
+        log_process_time(logger, start_time, f"[PID:{process_id}] Checked collection '{collection_name}' matches schema v{version}")
+        return diff
+
+    logger.warning(f"[PID:{process_id}] Collection '{collection_name}' drifted from schema v{version}: {diff}")
+    if apply_updates:
+        start_time = time.time()
+        client.collections[collection_name].update(func_schema.update_payload(expected_schema, diff))
+        log_process_time(logger, start_time, f"[PID:{process_id}] Collection '{collection_name}' updated to schema v{version}")
+    return diff
+
 def delete_old_collection(logger, process_id, client, collection_name):
     try:
         start_time = time.time()
         client.collections[collection_name].delete()
         log_process_time(logger, start_time, f"[PID:{process_id}] Collection '{collection_name}' deleted successfully")
     except ObjectNotFound:
-        log_process_time(logger, start_time, f"[PID:{process_id}] Collection '{collection_name}' NOT found, skipping delete")
\ No newline at end of file
+        log_process_time(logger, start_time, f"[PID:{process_id}] Collection '{collection_name}' NOT found, skipping delete")
+
+def delete_old_collections(logger, process_id, client, collection_name):
+    # month collection plus any finer (day/week) shards split from it
+    start_time = time.time()
+    split_names = [collection['name'] for collection in client.collections.retrieve() if collection['name'].startswith(collection_name) and collection['name'] != collection_name]
+    log_process_time(logger, start_time, f"[PID:{process_id}] Found {len(split_names)} split shard(s) of '{collection_name}'")
+    for name in [collection_name] + split_names:
+        delete_old_collection(logger, process_id, client, name)
\ No newline at end of file
@@ -0,0 +1,72 @@
+import base64
+import numpy as np
+from decimal import Decimal
+
+# base64 alphabet -> sextet value ('=' maps to 0, padding is counted separately)
+B64_LOOKUP = np.zeros(256, dtype=np.uint8)
+B64_LOOKUP[np.frombuffer(b'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/', dtype=np.uint8)] = np.arange(64, dtype=np.uint8)
+B64_VALID = np.zeros(256, dtype=bool)
+B64_VALID[np.frombuffer(b'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/=', dtype=np.uint8)] = True
+
+# decoded values up to 6 bytes fit in 48 bits, exact in float64
+VECTOR_MAX_BYTES = 6
+VECTOR_WIDTH = 12
+# below this column size the per-value path is faster than numpy setup
+VECTOR_MIN_ROWS = 64
+
+
+def avro_decimal_from_base64(b64, scale):
+    raw_bytes = base64.b64decode(b64)
+    int_value = int.from_bytes(raw_bytes, byteorder='big', signed=True)
+    return Decimal(int_value).scaleb(-scale)
+
+def avro_decimal_to_float(b64, scale):
+    # int / int is correctly rounded, same float as float(Decimal(...).scaleb(-scale))
+    int_value = int.from_bytes(base64.b64decode(b64), byteorder='big', signed=True)
+    if abs(int_value) >= 10 ** 28:
+        return float(Decimal(int_value).scaleb(-scale))
+    return int_value / 10 ** scale
+
+def avro_decimals_to_float(values, scale):
+    """Decode a column of base64 Avro decimals to floats in one numpy pass."""
+    if len(values) < VECTOR_MIN_ROWS or not all(isinstance(value, str) and value.isascii() and 0 < len(value) <= VECTOR_WIDTH for value in values):
+        return [avro_decimal_to_float(value, scale) for value in values]
+
+    # right-pad every value with '=' into a fixed-width char matrix
+    rows = len(values)
+    chars = np.frombuffer(''.join([value.ljust(VECTOR_WIDTH, '=') for value in values]).encode('ascii'), dtype=np.uint8).reshape(rows, VECTOR_WIDTH)
+    lengths = np.fromiter(map(len, values), dtype=np.int64, count=rows)
+    padding = chars == ord('=')
+    pad_counts = padding.sum(axis=1) - (VECTOR_WIDTH - lengths)
+    byte_counts = (lengths // 4) * 3 - pad_counts
+
+    # only well-formed values of up to VECTOR_MAX_BYTES bytes take the vector path
+    valid = B64_VALID[chars].all(axis=1) & (lengths % 4 == 0) & (pad_counts <= 2) & (byte_counts >= 1) & (byte_counts <= VECTOR_MAX_BYTES)
+    valid &= ~(padding & (np.arange(VECTOR_WIDTH) < (lengths - pad_counts)[:, None])).any(axis=1)
+
+    # sextets -> bytes (4 chars -> 3 bytes), first VECTOR_MAX_BYTES bytes are enough
+    sextets = B64_LOOKUP[chars].astype(np.int64).reshape(rows, VECTOR_WIDTH // 4, 4)
+    packed = (sextets[:, :, 0] << 18) | (sextets[:, :, 1] << 12) | (sextets[:, :, 2] << 6) | sextets[:, :, 3]
+    raw = np.stack([(packed >> 16) & 0xFF, (packed >> 8) & 0xFF, packed & 0xFF], axis=2).reshape(rows, -1)[:, :VECTOR_MAX_BYTES]
+
+    # big-endian two's complement over each row's own byte count
+    shifts = 8 * (byte_counts[:, None] - 1 - np.arange(VECTOR_MAX_BYTES))
+    in_value = shifts >= 0
+    int_values = (np.where(in_value, raw, 0) << np.where(in_value, shifts, 0)).sum(axis=1)
+    int_values -= np.where(raw[:, 0] >= 0x80, np.left_shift(1, 8 * np.clip(byte_counts, 0, VECTOR_MAX_BYTES)), 0)
+
+    results = (int_values.astype(np.float64) / float(10 ** scale)).tolist()
+    if not valid.all():
+        for index in np.nonzero(~valid)[0].tolist():
+            results[index] = avro_decimal_to_float(values[index], scale)
+    return results
+
+def convert_avro_decimal_fields(documents, fields, scale):
+    # column-wise decode of base64 string fields, written back in place
+    for field in fields:
+        column_docs = [document for document in documents if isinstance(document.get(field), str)]
+        if not column_docs:
+            continue
+        floats = avro_decimals_to_float([document[field] for document in column_docs], scale)
+        for document, float_value in zip(column_docs, floats):
+            document[field] = float_value
@@ -0,0 +1,51 @@
+import ujson
+import threading
+
+# one serialization buffer per thread (import pool workers, event loop)
+local = threading.local()
+
+
+def dumps_jsonl(documents):
+    """JSONL import body (bytes), serialized with ujson into a reused per-thread buffer."""
+    buffer = getattr(local, 'buffer', None)
+    if buffer is None:
+        buffer = local.buffer = bytearray()
+    del buffer[:]
+
+    # ascii-escaped like the typesense client's json.dumps, so a str body stays latin-1 safe
+    dumps = ujson.dumps
+    for document in documents:
+        # passthrough documents are already JSON
+        buffer += document if type(document) is RawDocument else dumps(document).encode()
+        buffer += b'\n'
+    del buffer[-1:]
+    return bytes(buffer)
+
+def loads_jsonl(text):
+    """Per-document import responses, one JSON object per line."""
+    loads = ujson.loads
+    return [loads(line) for line in text.split('\n') if line]
+
+
+class ImportResponse(list):
+    """Per-document import responses, with the size of the JSONL body that produced them."""
+
+    def __init__(self, responses, bytes_out):
+        super().__init__(responses)
+        self.bytes_out = bytes_out
+
+
+class RawDocument(bytes):
+    """A document kept as its original JSON bytes (passthrough ingest), with its id already extracted."""
+
+    def __new__(cls, raw, document_id):
+        document = super().__new__(cls, raw)
+        document.id = document_id
+        return document
+
+def document_id(document):
+    return document.id if type(document) is RawDocument else document['id']
+
+def as_dict(document):
+    # only for the rare paths that need fields (dead letters)
+    return ujson.loads(document) if type(document) is RawDocument else document
@@ -0,0 +1,181 @@
+import copy
+import json
+
+# transaction_month__YYYYMM
+TRANSACTION_FIELDS = [
+    {'name': 'id', 'type': 'string', 'facet': False, 'optional': False},
+    {'name': 'TRANID', 'type': 'int64', 'index': True, 'sort': True, 'optional': False},
+    {'name': 'ORDER_ID', 'type': 'string', 'index': True, 'sort': True, 'optional': True},
+    {'name': 'BILL_AMT', 'type': 'float', 'optional': True},
+    {'name': 'CUR_ACTUAL', 'type': 'string', 'facet': True, 'optional': True},
+    {'name': 'ACTUAL_AMT', 'type': 'float', 'optional': True},
+    {'name': 'STATUS', 'type': 'string', 'facet': True, 'optional': True},
+    {'name': 'TRANKEY', 'type': 'string', 'index': True, 'optional': True},
+    {'name': 'CREATE_DATE', 'type': 'int64', 'sort': True, 'optional': True},
+    {'name': 'CHARGEBACK_DATE', 'type': 'int64', 'sort': True, 'optional': True},
+    {'name': 'PAID_DATE', 'type': 'int64', 'sort': True, 'optional': True},
+    {'name': 'CHANNEL', 'type': 'string', 'facet': True, 'optional': True},
+    {'name': 'MERCHANTID', 'type': 'string', 'index': True, 'facet': True, 'optional': True},
+    {'name': 'BILLING_NAME', 'type': 'string', 'optional': True},
+    {'name': 'BILLING_EMAIL', 'type': 'string', 'optional': True},
+    {'name': 'BILLING_MOBILE', 'type': 'string', 'optional': True},
+    {'name': 'BILLING_INFO', 'type': 'string', 'optional': True},
+    {'name': 'APP_CODE', 'type': 'string', 'optional': True},
+    {'name': 'STATUS_DESC', 'type': 'string', 'optional': True},
+    {'name': 'REFUND_AMT', 'type': 'float', 'optional': True},
+    {'name': 'HISTORY', 'type': 'string', 'optional': True},
+    {'name': 'BIN', 'type': 'int32', 'optional': True},
+    {'name': 'IP', 'type': 'string', 'facet': True, 'optional': True},
+    {'name': 'DEF_AMT', 'type': 'float', 'optional': True}
+]
+
+# status_count_mins_month__YYYYMM
+STATUS_COUNT_MINS_FIELDS = [
+    {'name': 'id', 'type': 'string', 'facet': False},
+    {'name': 'MERCHANTID', 'type': 'string', 'index': True, 'facet': True},
+    {'name': 'CHANNEL', 'type': 'string', 'index': True, 'facet': True},
+    {'name': 'L_VERSION', 'type': 'string', 'index': True, 'facet': True},
+    {'name': 'UPDATE_DATE', 'type': 'int64', 'sort': True, 'index': True},
+    {'name': 'WINDOW_START', 'type': 'int64', 'sort': True, 'index': True},
+    {'name': 'WINDOW_END', 'type': 'int64', 'sort': True},
+    {'name': 'COUNT_AUTHORIZED', 'type': 'int32'},
+    {'name': 'COUNT_CAPTURED', 'type': 'int32'},
+    {'name': 'COUNT_HOLD', 'type': 'int32'},
+    {'name': 'COUNT_CHARGEBACK', 'type': 'int32'},
+    {'name': 'COUNT_CANCELLED', 'type': 'int32'},
+    {'name': 'COUNT_BLOCKED', 'type': 'int32'},
+    {'name': 'COUNT_FAILED', 'type': 'int32'},
+    {'name': 'COUNT_SETTLED', 'type': 'int32'},
+    {'name': 'COUNT_REQCANCEL', 'type': 'int32'},
+    {'name': 'COUNT_UNKNOWN', 'type': 'int32'},
+    {'name': 'COUNT_PENDING', 'type': 'int32'},
+    {'name': 'COUNT_RELEASE', 'type': 'int32'},
+    {'name': 'COUNT_REJECT', 'type': 'int32'},
+    {'name': 'COUNT_TESTOK', 'type': 'int32'},
+    {'name': 'COUNT_REQCHARGEBACK', 'type': 'int32'},
+    {'name': 'BILL_AMT', 'type': 'float'},
+    {'name': 'CURRENCY', 'type': 'string', 'index': True, 'facet': True}
+]
+
+# schema registry: bump `version` whenever fields change, live collections are diffed against it
+SCHEMA_REGISTRY = {
+    'transaction': {
+        'version': 1,
+        'prefix': 'transaction_month__',
+        'fields': TRANSACTION_FIELDS,
+        'default_sorting_field': 'TRANID'
+    },
+    'status_count_mins': {
+        'version': 1,
+        'prefix': 'status_count_mins_month__',
+        'fields': STATUS_COUNT_MINS_FIELDS,
+        'default_sorting_field': 'WINDOW_START'
+    }
+}
+
+# typesense field defaults, for attributes the registry leaves out
+FIELD_DEFAULTS = {'facet': False, 'index': True, 'optional': False}
+
+
+def schema_name(collection_name):
+    """Registry entry for a collection: its own name, a month collection or a day/week split shard."""
+    for name, entry in SCHEMA_REGISTRY.items():
+        if collection_name == name or collection_name.startswith(entry['prefix']):
+            return name
+    raise KeyError(f"No schema defined for collection '{collection_name}'")
+
+def schema_version(collection_name):
+    return SCHEMA_REGISTRY[schema_name(collection_name)]['version']
+
+def collection_schema(collection_name):
+    entry = SCHEMA_REGISTRY[schema_name(collection_name)]
+    return {'name': collection_name, 'fields': copy.deepcopy(entry['fields']), 'default_sorting_field': entry['default_sorting_field']}
+
+def diff_schema(expected_schema, live_schema):
+    """Differences between a registry schema and a retrieve() result, as {'added', 'removed', 'changed', ...}."""
+    # typesense does not list the implicit id field
+    expected_fields = {field['name']: field for field in expected_schema['fields'] if field['name'] != 'id'}
+    live_fields = {field['name']: field for field in live_schema.get('fields', []) if field['name'] != 'id'}
+
+    changed = {}
+    for name in expected_fields.keys() & live_fields.keys():
+        expected_field = expected_fields[name]
+        live_field = live_fields[name]
+        attributes = {}
+        for key in (expected_field.keys() | FIELD_DEFAULTS.keys()) - {'name'}:
+            expected_value = expected_field.get(key, FIELD_DEFAULTS.get(key))
+            live_value = live_field.get(key, FIELD_DEFAULTS.get(key))
+            if expected_value != live_value:
+                attributes[key] = {'expected': expected_value, 'live': live_value}
+        if attributes:
+            changed[name] = attributes
+
+    diff = {
+        'added': [expected_fields[name] for name in expected_fields if name not in live_fields],
+        'removed': [name for name in live_fields if name not in expected_fields],
+        'changed': changed
+    }
+    if expected_schema.get('default_sorting_field') != live_schema.get('default_sorting_field'):
+        diff['default_sorting_field'] = {'expected': expected_schema.get('default_sorting_field'), 'live': live_schema.get('default_sorting_field')}
+    return diff
+
+def has_drift(diff):
+    return any(diff.values())
+
+def update_payload(expected_schema, diff):
+    """Collection update() body bringing a live collection to the registry schema (drop + re-add changed fields)."""
+    expected_fields = {field['name']: field for field in expected_schema['fields']}
+    fields = [{'name': name, 'drop': True} for name in diff['removed']]
+    for name in diff['changed']:
+        fields.append({'name': name, 'drop': True})
+        fields.append(copy.deepcopy(expected_fields[name]))
+    fields.extend(copy.deepcopy(field) for field in diff['added'])
+    return {'fields': fields}
+
+
+def to_int(value):
+    # bad values pass through unchanged, typesense reports them per document
+    if type(value) is int:
+        return value
+    if type(value) is float:
+        # 12.0 -> 12, but 12.5 is not silently truncated
+        return int(value) if value.is_integer() else value
+    if type(value) is str:
+        try:
+            return int(value)
+        except ValueError:
+            return value
+    return value
+
+def to_float(value):
+    if type(value) is float:
+        return value
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return value
+
+def to_str(value):
+    # numbers as text, objects, arrays and booleans as JSON (not a Python repr)
+    if type(value) is str:
+        return value
+    if type(value) in (int, float):
+        return str(value)
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+
+FIELD_COERCIONS = {'int32': 'to_int', 'int64': 'to_int', 'float': 'to_float', 'string': 'to_str'}
+
+def compile_projector(schema):
+    """Generate project(document): schema fields only, nulls stripped, scalar types coerced, in one pass."""
+    lines = ['def project(document):', '    get = document.get', '    projected = {}']
+    for field in schema['fields']:
+        name = field['name']
+        coercion = FIELD_COERCIONS.get(field['type'])
+        lines.append(f'    value = get({name!r})')
+        lines.append('    if value is not None:')
+        lines.append(f'        projected[{name!r}] = {coercion}(value)' if coercion else f'        projected[{name!r}] = value')
+    lines.append('    return projected')
+
+    namespace = {'to_int': to_int, 'to_float': to_float, 'to_str': to_str}
+    exec('\n'.join(lines), namespace)
+    return namespace['project']
@@ -0,0 +1,70 @@
+import os
+import bisect
+from zoneinfo import ZoneInfo
+from datetime import datetime, timedelta
+
+# container TZ the month keys were always derived in
+SHARD_TIMEZONE = os.environ.get('TYPESENSE_SHARD_TIMEZONE', 'Asia/Kuala_Lumpur')
+
+GRANULARITIES = ('month', 'week', 'day')
+
+
+def period_starts(granularity, year, month, tz):
+    # (local start datetime, key) for every period of one month
+    month_start = datetime(year, month, 1, tzinfo=tz)
+    if granularity == 'month':
+        return [(month_start, f'{year:04d}{month:02d}')]
+
+    days_in_month = ((month_start + timedelta(days=32)).replace(day=1) - month_start).days
+    if granularity == 'day':
+        return [(datetime(year, month, day, tzinfo=tz), f'{year:04d}{month:02d}{day:02d}') for day in range(1, days_in_month + 1)]
+    if granularity == 'week':
+        # week of month, 7-day blocks from the 1st so weeks never cross a month
+        return [(datetime(year, month, day, tzinfo=tz), f'{year:04d}{month:02d}_W{(day - 1) // 7 + 1}') for day in range(1, days_in_month + 1, 7)]
+    raise ValueError(f"Unsupported shard granularity '{granularity}', expected one of {GRANULARITIES}")
+
+
+class PeriodKeyTable:
+    """Precomputed epoch-millis period boundaries -> shard keys for one granularity and timezone."""
+
+    def __init__(self, granularity='month', timezone=SHARD_TIMEZONE, start_year=2000, end_year=2100):
+        self.granularity = granularity
+        self.tz = ZoneInfo(timezone)
+        self.boundaries = []
+        self.keys = []
+        for year in range(start_year, end_year + 1):
+            for month in range(1, 13):
+                for period_start, key in period_starts(granularity, year, month, self.tz):
+                    self.boundaries.append(int(period_start.timestamp() * 1000))
+                    self.keys.append(key)
+        # last hit, consecutive records are usually in the same period
+        self.last_range = (0, -1, None)
+
+    def fallback(self, timestamp_ms):
+        dt_obj = datetime.fromtimestamp(timestamp_ms / 1000, tz=self.tz)
+        if self.granularity == 'month':
+            return dt_obj.strftime('%Y%m')
+        if self.granularity == 'day':
+            return dt_obj.strftime('%Y%m%d')
+        return f"{dt_obj.strftime('%Y%m')}_W{(dt_obj.day - 1) // 7 + 1}"
+
+    def key(self, timestamp_ms):
+        low, high, key = self.last_range
+        if low <= timestamp_ms < high:
+            return key
+
+        index = bisect.bisect_right(self.boundaries, timestamp_ms) - 1
+        if index < 0 or index + 1 >= len(self.boundaries):
+            return self.fallback(timestamp_ms)
+        self.last_range = (self.boundaries[index], self.boundaries[index + 1], self.keys[index])
+        return self.keys[index]
+
+
+# month table built at import (shared by forked workers), day/week on first use
+period_key_tables = {'month': PeriodKeyTable('month')}
+
+def period_key_table(granularity):
+    # day/week tables are only built when a strategy needs them
+    if granularity not in period_key_tables:
+        period_key_tables[granularity] = PeriodKeyTable(granularity)
+    return period_key_tables[granularity]
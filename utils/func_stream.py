@@ -0,0 +1,124 @@
+import re
+import json
+import codecs
+
+WHITESPACE = re.compile(r'[ \t\n\r]*')
+NUMBER_CHARS = '0123456789+-.eE'
+
+
+def iter_json_array(stream, chunk_size=65536):
+    """Yield the elements of a top-level JSON array while reading `stream` in chunks."""
+    decoder = json.JSONDecoder()
+    utf8_decoder = codecs.getincrementaldecoder('utf-8')()
+    buffer = ''
+    pos = 0
+    eof = stream is None
+    state = 'start'
+
+    def read_more(buffer, pos):
+        # drop consumed text before appending the next chunk
+        data = stream.read(chunk_size)
+        buffer = buffer[pos:] + utf8_decoder.decode(data or b'', final=not data)
+        return buffer, 0, not data
+
+    while True:
+        # next significant character
+        pos = WHITESPACE.match(buffer, pos).end()
+        while pos >= len(buffer) and not eof:
+            buffer, pos, eof = read_more(buffer, pos)
+            pos = WHITESPACE.match(buffer, pos).end()
+        if pos >= len(buffer):
+            if state == 'start':
+                raise ValueError('Empty request body')
+            raise ValueError('Unexpected end of JSON array')
+
+        char = buffer[pos]
+        if state == 'start':
+            if char != '[':
+                raise ValueError(f"Expected JSON array at position {pos}")
+            pos += 1
+            state = 'first_value'
+            continue
+        if char == ']' and state in ('first_value', 'after_value'):
+            # only whitespace may follow the array
+            pos += 1
+            while True:
+                pos = WHITESPACE.match(buffer, pos).end()
+                if pos < len(buffer):
+                    raise ValueError(f"Unexpected content after JSON array: {buffer[pos]!r}")
+                if eof:
+                    return
+                buffer, pos, eof = read_more(buffer, pos)
+        if state == 'after_value':
+            if char != ',':
+                raise ValueError(f"Expected ',' or ']' in JSON array, got {char!r}")
+            pos += 1
+            state = 'value'
+            continue
+
+        # decode one element, reading more when it is cut by the chunk boundary
+        while True:
+            try:
+                item, end = decoder.raw_decode(buffer, pos)
+                # a bare number cut at the chunk boundary may still continue in the next chunk
+                if eof or isinstance(item, (dict, list, str)) or (end < len(buffer) and buffer[end] not in NUMBER_CHARS):
+                    break
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            buffer, pos, eof = read_more(buffer, pos)
+
+        yield item
+        pos = end
+        state = 'after_value'
+
+
+# passthrough: documents kept as raw bytes, only a few fields are read
+FLAT_OBJECT = re.compile(rb'\{(?:[^{}"]++|"(?:[^"\\]++|\\.)*+")*+\}')
+ARRAY_SEPARATORS = re.compile(rb'[ \t\n\r,\[\]]*+')
+
+def iter_raw_objects(body):
+    """Yield each flat document of a JSON-lines body or JSON array as its original bytes."""
+    if not body.strip():
+        raise ValueError('Empty request body')
+
+    if body.lstrip()[:1] != b'[':
+        # one object per line, JSON strings cannot contain a raw newline
+        for line in body.split(b'\n'):
+            line = line.strip()
+            if not line:
+                continue
+            # same flat-object rule as arrays: a nested key would shadow the top-level id/timestamp
+            if not FLAT_OBJECT.fullmatch(line):
+                raise ValueError('Expected one flat JSON object per line, passthrough expects flat JSON objects')
+            yield line
+        return
+
+    position = 0
+    for match in FLAT_OBJECT.finditer(body):
+        if not ARRAY_SEPARATORS.fullmatch(body, position, match.start()):
+            raise ValueError(f'Unexpected content at byte {position}, passthrough expects flat JSON objects')
+        position = match.end()
+        yield match.group()
+    if not ARRAY_SEPARATORS.fullmatch(body, position):
+        raise ValueError(f'Unexpected content at byte {position}, passthrough expects flat JSON objects')
+
+def raw_field_pattern(name):
+    # a key is the only place a complete unescaped "NAME" can be followed by ':'
+    return re.compile(rb'"' + re.escape(name.encode('utf-8')) + rb'"\s*+:\s*+("(?:[^"\\]++|\\.)*+"|[^,}\s]++)')
+
+def raw_field_value(pattern, document):
+    match = pattern.search(document)
+    if match is None:
+        return None
+    token = match.group(1)
+    if token[:1] == b'"':
+        return json.loads(token)
+    if token == b'null':
+        return None
+    if token in (b'true', b'false'):
+        return token == b'true'
+    try:
+        return int(token)
+    except ValueError:
+        return float(token)